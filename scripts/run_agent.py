@@ -1,24 +1,18 @@
+from functools import partial
 from logging import getLogger
 
 from llama_index.agent.openai import OpenAIAgent
 from llama_index.llms.openai import OpenAI
 
-from agent.code_interpreter import CodeInterpreter, Constant, Function
+from agent.code_interpreter import CodeInterpreter, Constant, Function, ProcessCodeInterpreter
+from agent.kernel import KernelPool
 from agent.service import AgentService
+from agent.session import Session, SessionManager
 from environment.client import EnvClient
-from utils.constants import ENV_HOST_ADRESS, ENV_PORT, STD_ENV_HOST_ADRESS, STD_ENV_PORT
-from utils.logging import setup_logging
 
-setup_logging()
 logger = getLogger(__name__)
 
 
-class PatchedAgentService(AgentService):
-    async def reset(self) -> None:
-        super().reset()
-        interpreter.reset()
-
-
 SYSTEM_PROMPT = """You are an multilingual agent that controls a robot arm.{environment_description}
 
 ## Python Interpreter
@@ -48,24 +42,23 @@ CAUTION: The pre-defined functions and variables are only available inside the i
 You capabilities are limited to textual understanding. Make use of the pre-defined functions inside the code interpreter to interpret other modalities, e.g. images, in code.
 """  # noqa: E501
 
-constants = []
-functions = []
 
-# get functions and constants from the robot environment
-env_client = EnvClient(host=ENV_HOST_ADRESS, port=ENV_PORT)
-if env_client.healthy:
-    for info in env_client.get_action_infos():
+def load_environment(
+    client: EnvClient, functions: list[Function], constants: list[Constant]
+) -> None:
+    # get functions and constants from the environment
+    for info in client.get_action_infos():
         logger.info(f"Got function {info.name}{info.signature}")
         functions.append(
             Function(
-                fn=env_client.action_to_callable(info),
+                fn=client.action_to_callable(info),
                 name=info.name,
                 docstring=info.description,
                 signature=info.signature,
             )
         )
 
-    for const in env_client.consts.values():
+    for const in client.consts.values():
         logger.info(f"Got constant {const.name}={const.value}")
         constants.append(
             Constant.from_defaults(
@@ -75,51 +68,41 @@ if env_client.healthy:
             )
         )
 
-# get functions and constants from the std environment
-std_env_client = EnvClient(host=STD_ENV_HOST_ADRESS, port=STD_ENV_PORT)
-if std_env_client.healthy:
-    for info in std_env_client.get_action_infos():
-        logger.info(f"Got function {info.name}{info.signature}")
-        functions.append(
-            Function(
-                fn=std_env_client.action_to_callable(info),
-                name=info.name,
-                docstring=info.description,
-                signature=info.signature,
-            )
-        )
 
-    for const in std_env_client.consts.values():
-        logger.info(f"Got constant {const.name}={const.value}")
-        constants.append(
-            Constant.from_defaults(
-                name=const.name,
-                docstring=const.description,
-                value=const.value,
-            )
+def create_session(
+    session_id: str,
+    functions: list[Function],
+    constants: list[Constant],
+    kernel_pool: KernelPool | None = None,
+) -> Session:
+    # create the code interpreter tool, optionally running cells in a pool of warm kernels
+    if kernel_pool is not None:
+        interpreter = ProcessCodeInterpreter(
+            constants=constants, functions=functions, pool=kernel_pool
         )
+    else:
+        interpreter = CodeInterpreter(constants=constants, functions=functions)
+
+    # format the system prompt
+    system_prompt = SYSTEM_PROMPT.format(
+        # environment_description=(
+        #     f"\n\n{env_client.env_description}" if env_client.env_description != "" else ""
+        # ),
+        environment_description="",
+        function_descriptions=interpreter.get_function_descriptions(),
+        constant_descriptions=interpreter.get_constant_descriptions(),
+    )
 
-# create the code interpreter tool
-interpreter = CodeInterpreter(constants=constants, functions=functions)
-
-# format the system prompt
-SYSTEM_PROMPT = SYSTEM_PROMPT.format(
-    # environment_description=(
-    #     f"\n\n{env_client.env_description}" if env_client.env_description != "" else ""
-    # ),
-    environment_description="",
-    function_descriptions=interpreter.get_function_descriptions(),
-    constant_descriptions=interpreter.get_constant_descriptions(),
-)
-
-# Create the Agent with load/search tools
-agent = OpenAIAgent.from_tools(
-    llm=OpenAI(model="gpt-4o"),
-    tools=[interpreter.to_tool()],
-    system_prompt=SYSTEM_PROMPT,
-    max_function_calls=50
-    # verbose=True,
-)
+    # Create the Agent with load/search tools
+    agent = OpenAIAgent.from_tools(
+        llm=OpenAI(model="gpt-4o"),
+        tools=[interpreter.to_tool()],
+        system_prompt=system_prompt,
+        max_function_calls=50,
+        # verbose=True,
+    )
+
+    return Session(id=session_id, agent=agent, interpreter=interpreter)
 
 
 if __name__ == "__main__":
@@ -127,10 +110,62 @@ if __name__ == "__main__":
     from fastapi import FastAPI
     from fastapi.middleware.cors import CORSMiddleware
 
-    from utils.constants import AGENT_HOST_ADRESS, AGENT_PORT
+    from utils.constants import (
+        AGENT_HOST_ADRESS,
+        AGENT_KERNELS,
+        AGENT_MAX_MEMORY_BYTES,
+        AGENT_MAX_SESSIONS,
+        AGENT_PORT,
+        AGENT_SESSION_TIMEOUT,
+        ENV_HOST_ADRESS,
+        ENV_PORT,
+        STD_ENV_HOST_ADRESS,
+        STD_ENV_PORT,
+    )
+    from utils.logging import setup_logging
+
+    setup_logging()
+
+    constants = []
+    functions = []
+
+    # get functions and constants from the robot and the std environment
+    for client in [
+        EnvClient(host=ENV_HOST_ADRESS, port=ENV_PORT),
+        EnvClient(host=STD_ENV_HOST_ADRESS, port=STD_ENV_PORT),
+    ]:
+        if client.healthy:
+            load_environment(client, functions, constants)
+
+    # kernels shared by the interpreters of all sessions, used by default with multiple
+    # sessions since in-process interpreters run the cells of all sessions one at a time
+    if AGENT_KERNELS == 0 and AGENT_MAX_SESSIONS > 1:
+        logger.warning("Running without kernels, sessions cannot run code concurrently")
+    kernel_pool = (
+        KernelPool(functions=functions, constants=constants, size=AGENT_KERNELS)
+        if AGENT_KERNELS > 0
+        else None
+    )
+
+    sessions = SessionManager(
+        create=partial(
+            create_session, functions=functions, constants=constants, kernel_pool=kernel_pool
+        ),
+        max_sessions=AGENT_MAX_SESSIONS,
+        idle_timeout=AGENT_SESSION_TIMEOUT,
+        # only the memory of kernels is freed by closing sessions
+        memory_limit=(
+            AGENT_MAX_MEMORY_BYTES
+            if AGENT_MAX_MEMORY_BYTES > 0 and kernel_pool is not None
+            else None
+        ),
+    )
 
     app = FastAPI()
-    app.include_router(AgentService(agent))
+    app.include_router(AgentService(sessions))
+    # the service closes the sessions on shutdown, afterwards stop the warm kernels
+    if kernel_pool is not None:
+        app.router.add_event_handler("shutdown", kernel_pool.shutdown)
 
     app.add_middleware(
         CORSMiddleware,
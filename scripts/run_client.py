@@ -12,6 +12,7 @@ if __name__ == "__main__":
     from utils.constants import (
         AGENT_HOST_ADRESS,
         AGENT_PORT,
+        AGENT_SESSION,
         ENV_HOST_ADRESS,
         ENV_PORT,
         STD_ENV_HOST_ADRESS,
@@ -23,7 +24,10 @@ if __name__ == "__main__":
     setup_logging()
 
     # reset agent
-    httpx.get(f"http://{AGENT_HOST_ADRESS}:{AGENT_PORT}/reset")
+    httpx.get(
+        f"http://{AGENT_HOST_ADRESS}:{AGENT_PORT}/reset",
+        params={"session_id": AGENT_SESSION} if AGENT_SESSION is not None else {},
+    )
 
     env_client = EnvClient(host=ENV_HOST_ADRESS, port=ENV_PORT)
     std_env_client = EnvClient(host=STD_ENV_HOST_ADRESS, port=STD_ENV_PORT)
@@ -41,6 +45,10 @@ if __name__ == "__main__":
         # Run the WebSocket client
         asyncio.run(
             connect_and_receive_messages(
-                user_input, callbacks=callbacks, host=AGENT_HOST_ADRESS, port=AGENT_PORT
+                user_input,
+                callbacks=callbacks,
+                host=AGENT_HOST_ADRESS,
+                port=AGENT_PORT,
+                session_id=AGENT_SESSION,
             )
         )
@@ -0,0 +1,87 @@
+from time import perf_counter
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from environment.std_actions.image import ImageActions
+from environment.utils import pil_image_to_base64
+
+
+def draw_bounding_boxes_pil(
+    image: Image.Image,
+    bboxes: list[tuple[int, int, int, int]],
+    color: str = "red",
+    width: int = 5,
+) -> Image.Image:
+    # reference implementation drawing each box via PIL.ImageDraw
+    image_with_boxes = image.copy()
+    draw = ImageDraw.Draw(image_with_boxes)
+
+    for bbox in bboxes:
+        draw.rectangle(bbox, outline=color, width=width)
+
+    return image_with_boxes
+
+
+def random_boxes(
+    rng: np.random.Generator, resolution: tuple[int, int], n: int
+) -> list[tuple[int, int, int, int]]:
+    w, h = resolution
+    x1 = rng.integers(0, w - 64, size=n)
+    y1 = rng.integers(0, h - 64, size=n)
+    x2 = np.minimum(x1 + rng.integers(32, 400, size=n), w - 1)
+    y2 = np.minimum(y1 + rng.integers(32, 400, size=n), h - 1)
+    return list(zip(x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist(), strict=True))
+
+
+def timeit(fn, repeats: int) -> float:
+    # return the median runtime in milliseconds
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+if __name__ == "__main__":
+    resolutions = [(640, 480), (1280, 720), (1920, 1080), (3840, 2160)]
+    box_counts = [1, 10, 50, 200]
+    repeats = 20
+
+    rng = np.random.default_rng(0)
+    actions = ImageActions()
+
+    print(
+        f"{'resolution':>12} {'boxes':>6} {'pil [ms]':>10} {'new [ms]':>10} "
+        f"{'labels [ms]':>12} {'pil+enc [ms]':>13} {'preview+enc [ms]':>17} {'speedup':>8}"
+    )
+
+    for w, h in resolutions:
+        image = Image.fromarray(rng.integers(0, 255, size=(h, w, 3), dtype=np.uint8))
+
+        for n in box_counts:
+            bboxes = random_boxes(rng, (w, h), n)
+            labels = [f"object {i}" for i in range(n)]
+
+            t_pil = timeit(lambda: draw_bounding_boxes_pil(image, bboxes), repeats)
+            t_new = timeit(lambda: actions.draw_bounding_boxes(image, bboxes), repeats)
+            t_labels = timeit(
+                lambda: actions.draw_bounding_boxes(image, bboxes, labels=labels, show_ids=True),
+                repeats,
+            )
+            # include the transport encoding the result goes through in the remote env
+            t_pil_enc = timeit(
+                lambda: pil_image_to_base64(draw_bounding_boxes_pil(image, bboxes)), repeats
+            )
+            t_preview_enc = timeit(
+                lambda: pil_image_to_base64(
+                    actions.draw_bounding_boxes(image, bboxes, labels=labels, preview=640)
+                ),
+                repeats,
+            )
+
+            print(
+                f"{f'{w}x{h}':>12} {n:>6} {t_pil:>10.2f} {t_new:>10.2f} {t_labels:>12.2f} "
+                f"{t_pil_enc:>13.2f} {t_preview_enc:>17.2f} {t_pil_enc / t_preview_enc:>7.1f}x"
+            )
@@ -0,0 +1,60 @@
+import argparse
+
+from environment.remote import RemoteEnv
+from environment.telemetry import TelemetryRouter
+from robot.registry import RobotRegistry
+from utils.constants import TELEMETRY_RATE
+from utils.logging import setup_logging
+
+setup_logging()
+
+ENV_DESCRIPTION = """## Environment
+The environment consists of multiple robot cells, each a workspace where a robot arm can move, interact with objects, and perform basic manipulation tasks. Every action takes a `robot` keyword argument selecting the cell to act in, cells can work in parallel. The robot arm can precisely navigate to different coordinates within its workspace, allowing it to approach and engage with various objects positioned throughout the area. It can grab a single object, holding it securely until instructed to release it. The robot can only handle one object at a time and does not have the ability to pick up multiple objects simultaneously. Tasks may involve positioning, moving, or sorting objects based on their location or type."""  # noqa: E501
+
+
+if __name__ == "__main__":
+    import uvicorn
+    from fastapi import FastAPI
+
+    from utils.constants import ENV_HOST_ADRESS, ENV_PORT
+
+    parser = argparse.ArgumentParser(description="Serve multiple robots in one environment.")
+    parser.add_argument("--config", default="data/robots.json")
+    args = parser.parse_args()
+
+    env = RemoteEnv(description=ENV_DESCRIPTION)
+
+    # register the robot actions once, routed to the robot given by name
+    registry = RobotRegistry.load(args.config)
+    for action in registry.actions:
+        env.register_action(action)
+
+    # register world boundaries
+    env.register_const(
+        name="robots",
+        description="Names of the robots, the `robot` argument of the actions.",
+        value=list(registry.robots),
+    )
+    env.register_const(
+        name="world_boundaries",
+        description="Defines each robot's operational area with coordinates (min_x, min_y, max_x, max_y).",  # noqa: E501
+        value={name: robot.actions.main_workspace for name, robot in registry.robots.items()},
+    )
+    env.register_const(
+        name="PlateA", description="Position of Plate A in world coordinates.", value=(0, 350)
+    )
+    env.register_const(
+        name="PlateB", description="Position of Plate B in world coordinates.", value=(-200, 350)
+    )
+
+    # create the app that serves the environment and the telemetry of each robot
+    app = FastAPI()
+    app.include_router(env)
+    for name, robot in registry.robots.items():
+        app.include_router(
+            TelemetryRouter(
+                robot.actions.get_telemetry, rate=TELEMETRY_RATE, path=f"/telemetry/{name}"
+            )
+        )
+
+    uvicorn.run(app, host=ENV_HOST_ADRESS, port=ENV_PORT, reload=False)
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import threading
+from time import perf_counter, sleep
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI
+from PIL import Image, ImageDraw
+
+from environment.client import EnvClient
+from environment.remote import RemoteEnv
+from environment.std_actions.image import ImageActions
+from environment.utils import base64_to_pil_image, pil_image_to_base64
+from utils.benchmark import run_metadata
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+DENSITIES = [1, 5, 20]
+EXAMPLE_IMAGE = "data/example_image.jpeg"
+
+
+def synthetic_scene(
+    rng: np.random.Generator, resolution: tuple[int, int], n_objects: int
+) -> Image.Image:
+    # bright background with dark-ish objects, matching the thresholding in detect_objects
+    w, h = resolution
+    background = rng.integers(170, 230, size=3).tolist()
+    image = Image.new("RGB", (w, h), tuple(background))
+    draw = ImageDraw.Draw(image)
+
+    # keep objects above the minimal detection size but small enough to fit the scene
+    size = max(160, min(w, h) // (2 + int(np.sqrt(n_objects))))
+    for _ in range(n_objects):
+        x = int(rng.integers(0, max(1, w - size)))
+        y = int(rng.integers(0, max(1, h - size)))
+        color = tuple(rng.integers(0, 140, size=3).tolist())
+        if rng.random() < 0.5:
+            draw.rectangle((x, y, x + size, y + size), fill=color)
+        else:
+            draw.ellipse((x, y, x + size, y + size), fill=color)
+
+    return image
+
+
+def scenes(rng: np.random.Generator) -> list[tuple[str, int, Image.Image]]:
+    scenes = [
+        (f"synthetic_{w}x{h}_{n}", n, synthetic_scene(rng, (w, h), n))
+        for w, h in RESOLUTIONS
+        for n in DENSITIES
+    ]
+    if os.path.exists(EXAMPLE_IMAGE):
+        image = Image.open(EXAMPLE_IMAGE)
+        image.load()
+        scenes.append(("example_image", -1, image))
+    return scenes
+
+
+def measure(fn, repeats: int, warmup: int = 1) -> dict[str, float]:
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        fn()
+        times.append(1000 * (perf_counter() - start))
+
+    return {
+        "median_ms": float(np.median(times)),
+        "p90_ms": float(np.percentile(times, 90)),
+        "min_ms": float(np.min(times)),
+        "max_ms": float(np.max(times)),
+    }
+
+
+def decode(str_base64: str) -> Image.Image:
+    # PIL decodes lazily, force decoding to measure the full codec
+    image = base64_to_pil_image(str_base64)
+    image.load()
+    return image
+
+
+def serve(env: RemoteEnv, port: int) -> tuple[uvicorn.Server, EnvClient]:
+    app = FastAPI()
+    app.include_router(env)
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+
+    client = EnvClient(host="127.0.0.1", port=port)
+    while not client.healthy:
+        sleep(0.1)
+
+    return server, client
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the std environment image actions.")
+    parser.add_argument("--output", default="output/perception_benchmark.jsonl")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--no-remote", action="store_true", help="Skip the HTTP benchmarks.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    actions = ImageActions()
+
+    env = RemoteEnv()
+    env.register_action(actions.detect_objects)
+    env.register_action(actions.crop_image)
+    env.register_action(actions.crop_images)
+    env.register_action(actions.detect_and_crop)
+    env.register_action(actions.draw_bounding_boxes)
+
+    server, client = (None, None) if args.no_remote else serve(env, args.port)
+    if client is not None:
+        remote = {info.name: client.action_to_callable(info) for info in client.get_action_infos()}
+
+    metadata = run_metadata()
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    with open(args.output, "a") as fp:
+        for name, n_objects, image in scenes(rng):
+            bboxes = actions.detect_objects(image)
+            bbox = bboxes[0] if len(bboxes) > 0 else (0, 0, image.width // 2, image.height // 2)
+            str_base64 = pil_image_to_base64(image)
+
+            operations = {
+                "local": {
+                    "detect_objects": lambda: actions.detect_objects(image),
+                    "crop_image": lambda: actions.crop_image(image, bbox),
+                    "crop_images": lambda: actions.crop_images(image, bboxes),
+                    "detect_and_crop": lambda: actions.detect_and_crop(image),
+                    "draw_bounding_boxes": lambda: actions.draw_bounding_boxes(image, bboxes),
+                    "pil_image_to_base64": lambda: pil_image_to_base64(image),
+                    "base64_to_pil_image": lambda: decode(str_base64),
+                },
+            }
+            if client is not None:
+                operations["remote"] = {
+                    "detect_objects": lambda: remote["detect_objects"](image),
+                    "crop_image": lambda: remote["crop_image"](image, bbox),
+                    "crop_images": lambda: remote["crop_images"](image, bboxes),
+                    "detect_and_crop": lambda: remote["detect_and_crop"](image),
+                    "draw_bounding_boxes": lambda: remote["draw_bounding_boxes"](image, bboxes),
+                }
+
+            for mode, ops in operations.items():
+                for operation, fn in ops.items():
+                    result = {
+                        "scene": name,
+                        "resolution": list(image.size),
+                        "objects": n_objects,
+                        "detected": len(bboxes),
+                        "encoded_bytes": len(str_base64),
+                        "operation": operation,
+                        "mode": mode,
+                        "repeats": args.repeats,
+                        **measure(fn, args.repeats),
+                        **metadata,
+                    }
+                    fp.write(json.dumps(result) + "\n")
+                    print(
+                        f"{name:>28} {mode:>6} {operation:>20} "
+                        f"{result['median_ms']:>9.2f} ms (p90 {result['p90_ms']:.2f} ms)"
+                    )
+
+    if server is not None:
+        server.should_exit = True
@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+from time import perf_counter
+
+import numpy as np
+
+from robot.actions import RobotActions
+from robot.camera import FakeCamera
+from robot.sim import SceneRenderer, SimObject, SimulatedCRIController
+from robot.transform import WorldTransform
+from utils.benchmark import run_metadata
+
+# object positions in the main workspace and the plates they are moved to and back from
+SOURCES = [(300, -150), (250, 0), (350, 150)]
+PLATES = [(0, 350), (-200, 350)]
+GRIPPER_FEEDBACK = 0
+
+
+def sequential(robot: RobotActions, src: tuple[float, float], dst: tuple[float, float]) -> dict:
+    # the pick and place as issued by agent code, one action per step
+    steps = [
+        ("move_to_source", lambda: robot.move_to(*src)),
+        ("grab", robot.grab_object),
+        ("move_to_destination", lambda: robot.move_to(*dst)),
+        ("release", robot.release_object),
+    ]
+    return robot.run_steps(steps)
+
+
+def fused(robot: RobotActions, src: tuple[float, float], dst: tuple[float, float]) -> dict:
+    return robot.pick_and_place(src, dst)
+
+
+MODES = {
+    "sequential": (sequential, False),
+    "sequential_blended": (sequential, True),
+    "fused": (fused, False),
+    "fused_blended": (fused, True),
+}
+
+
+def cycles(n: int) -> list[tuple[tuple[float, float], tuple[float, float]]]:
+    # move each object to a plate and back, such that the scene is reusable
+    moves = []
+    for i in range((n + 1) // 2):
+        src, dst = SOURCES[i % len(SOURCES)], PLATES[i % len(PLATES)]
+        moves += [(src, dst), (dst, src)]
+    return moves[:n]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pick cycles on the simulated robot.")
+    parser.add_argument("--output", default="output/pick_benchmark.jsonl")
+    parser.add_argument("--cycles", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--velocity", type=float, default=100)
+    parser.add_argument("--acceleration", type=float, default=1000)
+    args = parser.parse_args()
+
+    world_transform = WorldTransform.load("data/world_state.json")
+    metadata = run_metadata()
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    with open(args.output, "a") as fp:
+        for mode in args.modes:
+            fn, blending = MODES[mode]
+
+            controller = SimulatedCRIController(
+                objects=[SimObject(x, y) for x, y in SOURCES],
+                acceleration=args.acceleration,
+                gripper_feedback=GRIPPER_FEEDBACK,
+            )
+            robot = RobotActions(
+                controller=controller,
+                camera=FakeCamera(SceneRenderer(controller, world_transform)),
+                gripper_feedback=GRIPPER_FEEDBACK,
+                blending=blending,
+            )
+            robot.velocity = args.velocity
+
+            durations = []
+            for i, (src, dst) in enumerate(cycles(args.cycles)):
+                start = perf_counter()
+                report = fn(robot, src, dst)
+                durations.append(perf_counter() - start)
+
+                result = {
+                    "mode": mode,
+                    "cycle": i,
+                    "src": src,
+                    "dst": dst,
+                    "velocity": args.velocity,
+                    "acceleration": args.acceleration,
+                    "cycle_s": durations[-1],
+                    **report,
+                    **metadata,
+                }
+                fp.write(json.dumps(result) + "\n")
+
+            print(
+                f"{mode:>20} {np.mean(durations):>7.2f} s/cycle "
+                f"(min {np.min(durations):.2f} s, max {np.max(durations):.2f} s)"
+            )
+            waits = {name: round(s["mean_s"], 3) for name, s in robot.get_wait_stats().items()}
+            print(f"{'':>20} mean waits (s): {waits}")
+            robot.shutdown()
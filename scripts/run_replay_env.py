@@ -0,0 +1,34 @@
+import argparse
+
+from environment.replay import ReplayEnv
+from utils.logging import setup_logging
+
+setup_logging()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    from fastapi import FastAPI
+
+    from utils.constants import ENV_HOST_ADRESS, ENV_PORT
+
+    parser = argparse.ArgumentParser(description="Serve the action results of a recorded trace.")
+    parser.add_argument(
+        "trace", help="Trace recorded with TRACE_PATH set, e.g. trace.robot.jsonl.gz"
+    )
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=1.0,
+        help="Multiplier of the recorded durations, 0 replays without delays.",
+    )
+    parser.add_argument("--port", type=int, default=ENV_PORT)
+    args = parser.parse_args()
+
+    env = ReplayEnv(args.trace, time_scale=args.time_scale)
+
+    # create the app that serves the environment
+    app = FastAPI()
+    app.include_router(env)
+
+    uvicorn.run(app, host=ENV_HOST_ADRESS, port=args.port, reload=False)
@@ -1,6 +1,12 @@
+import os
+
 from environment.remote import RemoteEnv
+from environment.telemetry import TelemetryRouter
+from environment.trace import trace_path
 from robot.actions import RobotActions
+from robot.preprocessing import PreprocessingPipeline
 from robot.transform import WorldTransform
+from utils.constants import ROBOT_BLENDING, ROBOT_PREFETCH, TELEMETRY_RATE
 from utils.logging import setup_logging
 
 setup_logging()
@@ -10,15 +16,25 @@ The environment is a workspace where a robot arm can move, interact with objects
 
 env = RemoteEnv(description=ENV_DESCRIPTION)
 
+# camera preprocessing, e.g. undistortion parameters from the camera calibration
+preprocessing = None
+if os.path.exists("data/camera.json"):
+    preprocessing = PreprocessingPipeline.load("data/camera.json")
+
 # register all robot actions
-robot = RobotActions()
+robot = RobotActions(preprocessing=preprocessing, prefetch=ROBOT_PREFETCH, blending=ROBOT_BLENDING)
 for action in robot.actions:
     env.register_action(action)
 
+# stream the robot state to monitoring clients
+telemetry = TelemetryRouter(robot.get_telemetry, rate=TELEMETRY_RATE)
+
 # register world transform actions
 world_transform = WorldTransform.load("data/world_state.json")
 env.register_action(world_transform.transform_pixel_to_world_coords)
-# env.register_action(world_transform.transform_world_to_pixel_coords)
+env.register_action(world_transform.transform_world_to_pixel_coords)
+env.register_action(world_transform.pixels_to_world)
+env.register_action(world_transform.world_to_pixels)
 
 # register world boundaries
 env.register_const(
@@ -38,10 +54,16 @@ if __name__ == "__main__":
     import uvicorn
     from fastapi import FastAPI
 
-    from utils.constants import ENV_HOST_ADRESS, ENV_PORT
+    from utils.constants import ENV_HOST_ADRESS, ENV_PORT, TRACE_PATH
+
+    # record all action calls for a later replay with run_replay_env.py
+    if TRACE_PATH is not None:
+        # environments started together record to separate files
+        env.record(trace_path(TRACE_PATH, "robot"))
 
     # create the app that serves the environment
     app = FastAPI()
     app.include_router(env)
+    app.include_router(telemetry)
 
     uvicorn.run(app, host=ENV_HOST_ADRESS, port=ENV_PORT, reload=False)
@@ -0,0 +1,85 @@
+import numpy as np
+
+from environment.remote import RemoteEnv
+from environment.telemetry import TelemetryRouter
+from environment.trace import trace_path
+from robot.actions import RobotActions
+from robot.camera import FakeCamera
+from robot.sim import SceneRenderer, SimObject, SimulatedCRIController
+from robot.transform import WorldTransform
+from utils.constants import ROBOT_BLENDING, ROBOT_PREFETCH, TELEMETRY_RATE
+from utils.logging import setup_logging
+
+setup_logging()
+
+ENV_DESCRIPTION = """## Environment
+The environment is a workspace where a robot arm can move, interact with objects, and perform basic manipulation tasks. The robot arm can precisely navigate to different coordinates within this workspace, allowing it to approach and engage with various objects positioned throughout the area. It can grab a single object, holding it securely until instructed to release it. The robot can only handle one object at a time and does not have the ability to pick up multiple objects simultaneously. Tasks may involve positioning, moving, or sorting objects based on their location or type."""  # noqa: E501
+
+# number of objects randomly placed in the main workspace
+NUM_OBJECTS = 4
+# digital input reporting whether the simulated gripper holds an object
+GRIPPER_FEEDBACK = 0
+
+env = RemoteEnv(description=ENV_DESCRIPTION)
+
+# simulated robot and a camera rendering the simulated objects
+rng = np.random.default_rng(0)
+objects = [
+    SimObject(x=float(rng.uniform(230, 370)), y=float(rng.uniform(-200, 200)))
+    for _ in range(NUM_OBJECTS)
+]
+controller = SimulatedCRIController(objects=objects, gripper_feedback=GRIPPER_FEEDBACK)
+world_transform = WorldTransform.load("data/world_state.json")
+camera = FakeCamera(SceneRenderer(controller, world_transform))
+
+# register all robot actions
+robot = RobotActions(
+    controller=controller,
+    camera=camera,
+    gripper_feedback=GRIPPER_FEEDBACK,
+    prefetch=ROBOT_PREFETCH,
+    blending=ROBOT_BLENDING,
+)
+for action in robot.actions:
+    env.register_action(action)
+
+# stream the robot state to monitoring clients
+telemetry = TelemetryRouter(robot.get_telemetry, rate=TELEMETRY_RATE)
+
+# register world transform actions
+env.register_action(world_transform.transform_pixel_to_world_coords)
+env.register_action(world_transform.transform_world_to_pixel_coords)
+env.register_action(world_transform.pixels_to_world)
+env.register_action(world_transform.world_to_pixels)
+
+# register world boundaries
+env.register_const(
+    name="world_boundaries",
+    description="Defines the robot's operational area with coordinates (min_x, min_y, max_x, max_y).",  # noqa: E501
+    value=robot.main_workspace,
+)
+env.register_const(
+    name="PlateA", description="Position of Plate A in world coordinates.", value=(0, 350)
+)
+env.register_const(
+    name="PlateB", description="Position of Plate B in world coordinates.", value=(-200, 350)
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    from fastapi import FastAPI
+
+    from utils.constants import ENV_HOST_ADRESS, ENV_PORT, TRACE_PATH
+
+    # record all action calls for a later replay with run_replay_env.py
+    if TRACE_PATH is not None:
+        # environments started together record to separate files
+        env.record(trace_path(TRACE_PATH, "sim"))
+
+    # create the app that serves the environment
+    app = FastAPI()
+    app.include_router(env)
+    app.include_router(telemetry)
+
+    uvicorn.run(app, host=ENV_HOST_ADRESS, port=ENV_PORT, reload=False)
@@ -1,19 +1,27 @@
 from environment.remote import RemoteEnv
+from environment.std_actions.cache import ResponseCache
 from environment.std_actions.image import ImageActions
 from environment.std_actions.vlm import VisionLanguageModelAction
+from environment.trace import trace_path
+from utils.constants import VLM_CACHE_MAX_BYTES, VLM_CACHE_PATH, VLM_CACHE_TTL
 from utils.logging import setup_logging
 
 setup_logging()
 
 env = RemoteEnv()
 
-vlm = VisionLanguageModelAction(model="gpt-4o")
+cache = ResponseCache(VLM_CACHE_PATH, max_bytes=VLM_CACHE_MAX_BYTES, ttl=VLM_CACHE_TTL)
+vlm = VisionLanguageModelAction(model="gpt-4o", cache=cache)
 env.register_action(vlm.prompt_vision_model)
+env.register_action(vlm.prompt_vision_model_batch)
+env.register_action(vlm.stream_vision_model)
 
 # register object detection
 image_actions = ImageActions()
 env.register_action(image_actions.detect_objects)
 env.register_action(image_actions.crop_image)
+env.register_action(image_actions.crop_images)
+env.register_action(image_actions.detect_and_crop)
 env.register_action(image_actions.draw_bounding_boxes)
 
 
@@ -21,7 +29,12 @@ if __name__ == "__main__":
     import uvicorn
     from fastapi import FastAPI
 
-    from utils.constants import STD_ENV_HOST_ADRESS, STD_ENV_PORT
+    from utils.constants import STD_ENV_HOST_ADRESS, STD_ENV_PORT, TRACE_PATH
+
+    # record all action calls for a later replay with run_replay_env.py
+    if TRACE_PATH is not None:
+        # environments started together record to separate files
+        env.record(trace_path(TRACE_PATH, "std"))
 
     # create the app that serves the environment
     app = FastAPI()
@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import inspect
 import io
 import logging
 import sys
+import threading
 from dataclasses import dataclass
 from typing import Any, Callable
 
 from IPython.terminal.interactiveshell import TerminalInteractiveShell
 from llama_index.core.tools import FunctionTool
 
+from agent.kernel import SHELL_CONFIG, Kernel, KernelError, KernelPool, process_memory
+from agent.namespace import ShellNamespace
+
 logger = logging.getLogger(__name__)
 
 
@@ -69,14 +75,37 @@ CODE_INTERPRETER_PROMPT = """The `python` interpreter tool.
 With this tool you can execute Python code in a Jupyter-like environment. This environment has persistent memory, meaning all variables, functions, and objects that you define will remain available for subsequent calls to the `python` interpreter.
 """  # noqa: E501
 
+# stdout and the traps IPython installs while running a cell, e.g. the displayhook, are
+# process-global, such that cells of in-process interpreters run one at a time. Use
+# `ProcessCodeInterpreter`s to run the cells of multiple sessions concurrently.
+run_lock = threading.Lock()
+
+
+def checkpoint_functions() -> list[Function]:
+    # the checkpoint functions injected into the shell by `ShellNamespace`
+    return [
+        Function.from_defaults(
+            fn, docstring=inspect.cleandoc(fn.__doc__), signature="(name: str) -> None"
+        )
+        for fn in (ShellNamespace.checkpoint, ShellNamespace.rollback)
+    ]
+
 
 class CodeInterpreter:
-    def __init__(self, constants: list[Constant], functions: list[Function] | None = None) -> None:
+    def __init__(
+        self,
+        constants: list[Constant],
+        functions: list[Function] | None = None,
+        checkpoints: bool = True,
+    ) -> None:
         self.history: list[CodeCell] = []
         self.functions = functions or []
         self.constants = constants or []
+        self.checkpoints = checkpoints
         # Create an embedded IPython instance
         self.shell = self.create_shell()
+        # the namespace after injecting the functions and constants, restored on reset
+        self.namespace = ShellNamespace(self.shell, checkpoints)
 
     def run_cell(self, code: str) -> str:
         """Runs python code in a ipython cell and returns the captured stdout.
@@ -90,14 +119,15 @@ class CodeInterpreter:
         logger.info("------ Code ------\n" + code + "\n------------")
         # Create a StringIO buffer to capture output
         buffer = io.StringIO()
-        # Redirect stdout to the buffer
-        sys.stdout = buffer  # noqa: B018
-        try:
-            # Execute the code
-            self.shell.run_cell(code)
-        finally:
-            # Restore stdout
-            sys.stdout = sys.__stdout__
+        with run_lock:
+            # Redirect stdout to the buffer
+            sys.stdout = buffer  # noqa: B018
+            try:
+                # Execute the code
+                self.shell.run_cell(code)
+            finally:
+                # Restore stdout
+                sys.stdout = sys.__stdout__
 
         # Retrieve the captured output
         output = buffer.getvalue()
@@ -108,7 +138,8 @@ class CodeInterpreter:
         return str(output)
 
     def create_shell(self) -> TerminalInteractiveShell:
-        shell = TerminalInteractiveShell.instance()
+        # not the singleton instance, such that every interpreter has its own namespace
+        shell = TerminalInteractiveShell(config=SHELL_CONFIG)
         for func in self.functions:
             shell.user_ns[func.name] = func.fn
         for const in self.constants:
@@ -116,8 +147,17 @@ class CodeInterpreter:
         return shell
 
     def reset(self) -> None:
-        del self.shell
-        self.shell = self.create_shell()
+        self.namespace.reset()
+
+    def close(self) -> None:
+        # free the user namespace, the shell itself stays referenced by IPython internals
+        self.shell.reset(new_session=False)
+        self.shell.atexit_operations()
+        atexit.unregister(self.shell.atexit_operations)
+
+    def memory_usage(self) -> int:
+        """Bytes freed by closing the interpreter, 0 for shells in the agent process."""
+        return 0
 
     def to_tool(self) -> FunctionTool:
         return FunctionTool.from_defaults(
@@ -135,10 +175,11 @@ class CodeInterpreter:
         )
 
     def get_function_descriptions(self) -> str:
+        functions = self.functions + (checkpoint_functions() if self.checkpoints else [])
         return "\n\n".join(
             [
                 f'def {fn.name}{fn.signature}\n    """{fn.docstring.strip()}\n    """\n'
-                for fn in self.functions
+                for fn in functions
             ]
         )
 
@@ -146,3 +187,97 @@ class CodeInterpreter:
         return "\n\n".join(
             [f'{const.name}: {const.dtype}\n"""{const.docstring}"""' for const in self.constants]
         )
+
+
+class ProcessCodeInterpreter(CodeInterpreter):
+    """Code interpreter that runs cells in a separate kernel process.
+
+    Kernels are taken from a pool of warm kernels that already have the functions and
+    constants injected, such that a reset only swaps in the next kernel of the pool. A
+    cell crashing or timing out only stops its kernel, which is then replaced. The pool
+    can be shared between interpreters with the same functions and constants.
+    """
+
+    def __init__(
+        self,
+        constants: list[Constant],
+        functions: list[Function] | None = None,
+        pool_size: int = 2,
+        timeout: float | None = None,
+        pool: KernelPool | None = None,
+        checkpoints: bool = True,
+    ) -> None:
+        self.history: list[CodeCell] = []
+        self.functions = functions or []
+        self.constants = constants or []
+        self.owns_pool = pool is None
+        self.pool = pool or KernelPool(
+            functions=self.functions,
+            constants=self.constants,
+            size=pool_size,
+            checkpoints=checkpoints,
+        )
+        # the checkpoint functions are injected by the kernels of the pool
+        self.checkpoints = self.pool.checkpoints
+        self.timeout = timeout
+        self.shell = self.create_shell()
+
+    def run_cell(self, code: str) -> str:
+        """Runs python code in a ipython cell and returns the captured stdout.
+
+        Args:
+            code (str): The code to run in the cells as one single string.
+
+        Returns:
+            (str): The output of the ipython cell including all captured stdout.
+        """
+        logger.info("------ Code ------\n" + code + "\n------------")
+        try:
+            output = self.shell.run_cell(code, timeout=self.timeout)
+        except KernelError as e:
+            logger.warning(f"{e}, restarting the interpreter")
+            self.reset()
+            output = f"{e}. The interpreter was restarted, all variables defined so far are lost."
+
+        self.history.append(CodeCell(input=code, output=output))
+
+        return output
+
+    async def arun_cell(self, code: str) -> str:
+        """Runs python code in a ipython cell and returns the captured stdout.
+
+        Args:
+            code (str): The code to run in the cells as one single string.
+
+        Returns:
+            (str): The output of the ipython cell including all captured stdout.
+        """
+        # wait for the kernel off the event loop
+        return await asyncio.to_thread(self.run_cell, code)
+
+    def create_shell(self) -> Kernel:
+        return self.pool.acquire()
+
+    def reset(self) -> None:
+        # a fresh kernel is already waiting, used kernels are not restored
+        self.pool.release(self.shell)
+        self.shell = self.create_shell()
+
+    def close(self) -> None:
+        self.pool.release(self.shell)
+
+    def memory_usage(self) -> int:
+        return process_memory(self.shell.process.pid)
+
+    def to_tool(self) -> FunctionTool:
+        return FunctionTool.from_defaults(
+            fn=self.run_cell,
+            async_fn=self.arun_cell,
+            name="python",
+            description=CODE_INTERPRETER_PROMPT,
+        )
+
+    def shutdown(self) -> None:
+        self.close()
+        if self.owns_pool:
+            self.pool.shutdown()
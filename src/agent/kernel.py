@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import io
+import logging
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import TYPE_CHECKING
+
+from IPython.terminal.interactiveshell import TerminalInteractiveShell
+from traitlets.config import Config
+
+from agent.namespace import ShellNamespace
+
+if TYPE_CHECKING:
+    from agent.code_interpreter import Constant, Function
+
+logger = logging.getLogger(__name__)
+
+# kernels are forked from a single-threaded server process instead of the multi-threaded
+# agent. The server does not import the main module, the functions and constants are
+# pickled and must be defined in modules the kernels can import.
+mp_context = mp.get_context("forkserver")
+# the server imports IPython and the interpreter once, such that kernels start without
+# importing them again
+mp_context.set_forkserver_preload(["agent.code_interpreter"])
+
+# the cells are kept in the interpreter history, the IPython history database would only add
+# a saving thread and a shared sqlite file per shell
+SHELL_CONFIG = Config({"HistoryManager": {"enabled": False}})
+
+
+def kernel_main(
+    conn: Connection, functions: list[Function], constants: list[Constant], checkpoints: bool
+) -> None:
+    # Ctrl+C reaches the whole process group, the agent stops its kernels on shutdown
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shell = TerminalInteractiveShell(config=SHELL_CONFIG)
+    for func in functions:
+        shell.user_ns[func.name] = func.fn
+    for const in constants:
+        shell.user_ns[const.name] = const.value
+    ShellNamespace(shell, checkpoints)
+    conn.send("ready")
+
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            break
+        if code is None:
+            break
+
+        buffer = io.StringIO()
+        sys.stdout = buffer  # noqa: B018
+        try:
+            shell.run_cell(code)
+        finally:
+            sys.stdout = sys.__stdout__
+        conn.send(buffer.getvalue())
+
+    conn.close()
+
+
+def process_memory(pid: int) -> int:
+    """Resident memory of a process in bytes, 0 where it cannot be read."""
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class KernelError(RuntimeError):
+    pass
+
+
+class _MainModulePickler(pickle.Pickler):
+    """Pickler that rejects references to the main module, which kernels do not import."""
+
+    def reducer_override(self, obj: object) -> object:
+        if getattr(obj, "__module__", None) == "__main__":
+            raise pickle.PicklingError(f"{obj!r} is defined in __main__")
+        return NotImplemented
+
+
+def check_picklable(functions: list[Function], constants: list[Constant]) -> None:
+    """Raises a `KernelError` if a function or constant cannot be sent to a kernel."""
+    for name, value in [(f.name, f.fn) for f in functions] + [(c.name, c.value) for c in constants]:
+        try:
+            _MainModulePickler(io.BytesIO()).dump(value)
+        except Exception as e:
+            raise KernelError(
+                f"'{name}' cannot be sent to a kernel, functions and constants must be "
+                f"picklable and defined in an importable module: {e}"
+            ) from e
+
+
+class Kernel:
+    """An IPython shell running in a separate process.
+
+    Cells are sent to the process over a pipe and their captured stdout is sent back.
+    A cell that crashes or blocks the kernel only affects this process, not the agent.
+    """
+
+    def __init__(
+        self, functions: list[Function], constants: list[Constant], checkpoints: bool = True
+    ) -> None:
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(
+            target=kernel_main, args=(child_conn, functions, constants, checkpoints), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def wait_ready(self, timeout: float | None = None) -> None:
+        if not self.conn.poll(timeout) or self.conn.recv() != "ready":
+            self.close()
+            raise KernelError("Kernel did not start")
+
+    def run_cell(self, code: str, timeout: float | None = None) -> str:
+        with self._lock:
+            if not self.alive:
+                raise KernelError("Kernel is not running")
+            try:
+                self.conn.send(code)
+                if not self.conn.poll(timeout):
+                    self.close()
+                    raise KernelError(f"Cell did not finish within {timeout}s, kernel stopped")
+                return self.conn.recv()
+            except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+                self.close()
+                raise KernelError(f"Kernel died with exit code {self.process.exitcode}") from e
+
+    def close(self, timeout: float = 1.0) -> None:
+        if self.alive:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout)
+        if self.alive:
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class KernelPool:
+    """Keeps a number of kernels warm, i.e. started and initialized with the functions
+    and constants, such that a fresh kernel is available without waiting.
+
+    Every kernel taken from the pool is replaced by a new one in the background.
+    """
+
+    def __init__(
+        self,
+        functions: list[Function],
+        constants: list[Constant],
+        size: int = 2,
+        start_timeout: float = 60.0,
+        checkpoints: bool = True,
+    ) -> None:
+        # fail now instead of after the start timeout of every kernel
+        check_picklable(functions, constants)
+        self.functions = functions
+        self.constants = constants
+        self.checkpoints = checkpoints
+        self.size = size
+        self.start_timeout = start_timeout
+        self._ready: queue.Queue[Kernel] = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="KernelPool")
+        self._closed = False
+        for _ in range(size):
+            self._executor.submit(self._start_kernel)
+
+    def _start_kernel(self) -> None:
+        start = time.perf_counter()
+        try:
+            kernel = Kernel(self.functions, self.constants, self.checkpoints)
+            kernel.wait_ready(self.start_timeout)
+        except Exception:
+            logger.exception("Failed to start kernel")
+            return
+
+        if self._closed:
+            kernel.close()
+            return
+        logger.info(f"Kernel {kernel.process.pid} warm after {time.perf_counter() - start:.2f}s")
+        self._ready.put(kernel)
+
+    def acquire(self, timeout: float | None = None) -> Kernel:
+        """Returns a warm kernel and starts a replacement."""
+        while True:
+            try:
+                kernel = self._ready.get(timeout=timeout or self.start_timeout)
+            except queue.Empty:
+                raise KernelError("No warm kernel available") from None
+            self._executor.submit(self._start_kernel)
+            if kernel.alive:
+                return kernel
+            kernel.close()
+
+    def release(self, kernel: Kernel) -> None:
+        # used kernels are never reused, they are stopped off the calling thread
+        threading.Thread(target=kernel.close, daemon=True).start()
+
+    def shutdown(self) -> None:
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        while not self._ready.empty():
+            self._ready.get_nowait().close()
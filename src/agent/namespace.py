@@ -0,0 +1,67 @@
+from IPython.core.interactiveshell import InteractiveShell
+
+_missing = object()
+
+
+class ShellNamespace:
+    """Snapshots of the user namespace of an IPython shell.
+
+    The namespace right after the shell was initialized, i.e. with the functions and
+    constants injected, is captured once. Restoring a snapshot deletes the names defined
+    since and rebinds the names that changed, which only touches the names that differ
+    instead of re-creating the shell. Snapshots are shallow: objects that were mutated
+    in place keep their changes.
+
+    With `checkpoints` enabled, the `checkpoint` and `rollback` methods are injected into
+    the shell, such that code running in it can create and restore named snapshots.
+    """
+
+    def __init__(self, shell: InteractiveShell, checkpoints: bool = False) -> None:
+        self.shell = shell
+        self.checkpoints: dict[str, dict] = {}
+        if checkpoints:
+            shell.user_ns["checkpoint"] = self.checkpoint
+            shell.user_ns["rollback"] = self.rollback
+        self.initial = dict(shell.user_ns)
+
+    def restore(self, snapshot: dict) -> None:
+        user_ns = self.shell.user_ns
+        for name in [name for name in user_ns if name not in snapshot]:
+            del user_ns[name]
+        for name, value in snapshot.items():
+            if user_ns.get(name, _missing) is not value:
+                user_ns[name] = value
+
+    def reset(self) -> None:
+        self.restore(self.initial)
+        self.checkpoints.clear()
+        # drop the cached inputs and outputs, they keep their values alive
+        self.shell.history_manager.reset(new_session=False)
+        self.shell.displayhook._ = self.shell.displayhook.__ = self.shell.displayhook.___ = ""
+        self.shell.execution_count = 1
+
+    def checkpoint(self, name: str) -> None:
+        """Saves all variables currently defined in the interpreter under the given name.
+
+        Use this after expensive setup steps, e.g. capturing and analysing images, to be
+        able to go back to this state with `rollback` instead of recomputing it.
+
+        Args:
+            name (str): The name of the checkpoint, an existing checkpoint with the same
+                name is replaced.
+        """
+        self.checkpoints[name] = dict(self.shell.user_ns)
+
+    def rollback(self, name: str) -> None:
+        """Restores the variables of the interpreter to the given checkpoint.
+
+        Variables defined after the checkpoint are removed and reassigned variables get
+        their previous value back. Objects modified in place, e.g. by appending to a list,
+        are not restored.
+
+        Args:
+            name (str): The name of a checkpoint created with `checkpoint`.
+        """
+        if name not in self.checkpoints:
+            raise KeyError(f"Unknown checkpoint '{name}', available are {list(self.checkpoints)}")
+        self.restore(self.checkpoints[name])
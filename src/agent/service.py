@@ -1,7 +1,10 @@
 import asyncio
 import logging
+import time
+from dataclasses import dataclass, field
 from typing import Any
 
+from fastapi import HTTPException
 from fastapi.routing import APIRoute, APIRouter, APIWebSocketRoute
 from fastapi.websockets import WebSocket, WebSocketDisconnect, WebSocketState
 from llama_index.core.agent import AgentChatResponse, AgentRunner
@@ -9,6 +12,8 @@ from llama_index.core.callbacks.base_handler import BaseCallbackHandler
 from llama_index.core.callbacks.schema import CBEventType, EventPayload
 from llama_index.core.llms import ChatMessage, ChatResponse
 
+from agent.session import Session, SessionManager
+
 logger = logging.getLogger(__name__)
 
 
@@ -115,18 +120,38 @@ class QueueCallback(BaseCallbackHandler):
                 self.queue.put_nowait(message)
 
 
-class AgentService(APIRouter):
-    def __init__(self, agent: AgentRunner, prefix: str = "") -> None:
-        self.agent = agent
-        self.agent_lock = asyncio.Lock()
-        self.connection_manager = ConnectionManager()
-        self.ws_queue: asyncio.Queue[ChatMessage] = asyncio.Queue()
+@dataclass
+class SessionChannel:
+    """Forwards the steps of a session to the websockets listening to it."""
+
+    connection_manager: ConnectionManager = field(default_factory=ConnectionManager)
+    ws_queue: asyncio.Queue[ChatMessage] = field(default_factory=asyncio.Queue)
+    queue_callback: QueueCallback = field(init=False)
+
+    def __post_init__(self) -> None:
         self.queue_callback = QueueCallback(self.ws_queue)
-        agent.callback_manager.add_handler(self.queue_callback)
+
+
+class AgentService(APIRouter):
+    """Serves the agent with one agent and interpreter per session.
+
+    Tasks of the same session run one after another, while different sessions run
+    concurrently. Requests without a session id use the default session.
+    """
+
+    def __init__(
+        self, sessions: SessionManager, prefix: str = "", default_session: str = "default"
+    ) -> None:
+        self.sessions = sessions
+        self.default_session = default_session
+        self.channels: dict[str, SessionChannel] = {}
+        sessions.on_close.append(self.close_channel)
 
         routes = [
             APIRoute(path="/reset", endpoint=self.reset, methods=["GET"]),
             APIRoute(path="/chat", endpoint=self.chat, methods=["POST"]),
+            APIRoute(path="/sessions", endpoint=self.list_sessions, methods=["GET"]),
+            APIRoute(path="/sessions/close", endpoint=self.close_session, methods=["POST"]),
             APIWebSocketRoute(path="/ws/steps", endpoint=self.ws_steps),
         ]
 
@@ -134,23 +159,62 @@ class AgentService(APIRouter):
             prefix=prefix,
             routes=routes,
         )
-
-    async def reset(self) -> None:
-        self.agent.reset()
-        self.queue_callback.reset()
-        logger.info("Agent resetted.")
-
-    async def chat(self, message: str) -> str:
-        message_loop_task = asyncio.create_task(self.message_loop())
-        async with self.agent_lock:
-            response = await self.run_task(message=message)
-            await self.queue_callback.queue.put(None)
+        # close the sessions, and with them their kernels, when the app shuts down
+        self.add_event_handler("shutdown", sessions.shutdown)
+
+    async def get_session(self, session_id: str | None) -> tuple[Session, SessionChannel]:
+        session = await self.sessions.get(session_id or self.default_session)
+        if session.id not in self.channels:
+            channel = SessionChannel()
+            session.agent.callback_manager.add_handler(channel.queue_callback)
+            self.channels[session.id] = channel
+        return session, self.channels[session.id]
+
+    def close_channel(self, session: Session) -> None:
+        channel = self.channels.pop(session.id, None)
+        if channel is not None:
+            asyncio.create_task(channel.connection_manager.disconnect_all())
+
+    async def reset(self, session_id: str | None = None) -> None:
+        session, channel = await self.get_session(session_id)
+        async with session.lock:
+            # resetting a kernel-backed interpreter may wait for a new kernel
+            await asyncio.to_thread(session.reset)
+            channel.queue_callback.reset()
+        logger.info(f"Agent of session '{session.id}' resetted.")
+
+    async def chat(self, message: str, session_id: str | None = None) -> str:
+        session, channel = await self.get_session(session_id)
+        message_loop_task = asyncio.create_task(self.message_loop(channel))
+        async with session.lock:
+            response = await self.run_task(session.agent, message=message)
+            await channel.queue_callback.queue.put(None)
 
         await message_loop_task
         return response.response
 
-    async def ws_steps(self, websocket: WebSocket) -> None:
-        await self.connection_manager.connect(websocket)
+    async def list_sessions(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "session_id": session.id,
+                "busy": session.busy,
+                "idle_s": now - session.last_used,
+                "memory_bytes": session.interpreter.memory_usage(),
+            }
+            for session in self.sessions.sessions.values()
+        ]
+
+    async def close_session(self, session_id: str) -> None:
+        if session_id not in self.sessions.sessions:
+            raise HTTPException(status_code=404, detail=f"Unknown session '{session_id}'")
+        session = self.sessions.sessions[session_id]
+        async with session.lock:
+            self.sessions.close(session_id)
+
+    async def ws_steps(self, websocket: WebSocket, session_id: str | None = None) -> None:
+        _, channel = await self.get_session(session_id)
+        await channel.connection_manager.connect(websocket)
 
         try:
             while True:
@@ -161,21 +225,21 @@ class AgentService(APIRouter):
         except Exception as e:
             print(f"Error in WebSocket communication: {e}")
         finally:
-            await self.connection_manager.disconnect(websocket)
+            await channel.connection_manager.disconnect(websocket)
 
-    async def run_task(self, message: str) -> AgentChatResponse:
-        task = self.agent.create_task(message)
+    async def run_task(self, agent: AgentRunner, message: str) -> AgentChatResponse:
+        task = agent.create_task(message)
 
-        while not (await self.agent.arun_step(task.task_id)).is_last:
+        while not (await agent.arun_step(task.task_id)).is_last:
             pass
 
         # now that the step execution is done, we can finalize response
-        response: AgentChatResponse = self.agent.finalize_response(task.task_id)
+        response: AgentChatResponse = agent.finalize_response(task.task_id)
 
         return response
 
-    async def message_loop(self) -> None:
-        while (chat_message := await self.ws_queue.get()) is not None:
-            await self.connection_manager.broadcast(chat_message.model_dump())
+    async def message_loop(self, channel: SessionChannel) -> None:
+        while (chat_message := await channel.ws_queue.get()) is not None:
+            await channel.connection_manager.broadcast(chat_message.model_dump())
 
-        await self.connection_manager.disconnect_all()
+        await channel.connection_manager.disconnect_all()
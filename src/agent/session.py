@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable
+
+from llama_index.core.agent import AgentRunner
+
+from agent.code_interpreter import CodeInterpreter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class Session:
+    id: str
+    agent: AgentRunner
+    interpreter: CodeInterpreter
+    # serializes the tasks of this session, other sessions run concurrently
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    def reset(self) -> None:
+        self.agent.reset()
+        self.interpreter.reset()
+
+    def close(self) -> None:
+        self.interpreter.close()
+
+
+class SessionManager:
+    """Creates, reuses and evicts the sessions of an agent service.
+
+    Every session has its own agent and interpreter. Sessions that were not used for
+    `idle_timeout` seconds are closed. When there are more than `max_sessions` sessions
+    or the interpreters use more than `memory_limit` bytes, the least recently used
+    sessions are closed as well. Busy sessions are never evicted.
+
+    The memory limit only counts memory that closing a session frees, i.e. the kernels of
+    `ProcessCodeInterpreter`s. Interpreters running in the agent process report none.
+    """
+
+    def __init__(
+        self,
+        create: Callable[[str], Session],
+        max_sessions: int = 8,
+        idle_timeout: float = 30 * 60,
+        memory_limit: int | None = None,
+        eviction_interval: float = 60.0,
+    ) -> None:
+        self.create = create
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.memory_limit = memory_limit
+        self.eviction_interval = eviction_interval
+        self.sessions: OrderedDict[str, Session] = OrderedDict()
+        # called with every session that is closed
+        self.on_close: list[Callable[[Session], None]] = []
+        self._task: asyncio.Task | None = None
+        # sessions being created, concurrent requests for the same session wait for them
+        self._creating: dict[str, asyncio.Task[Session]] = {}
+
+    async def get(self, session_id: str) -> Session:
+        """Returns the session with the given id, creating it if it does not exist.
+
+        Sessions are created off the event loop, creating an interpreter may wait for a
+        kernel to start.
+        """
+        if session_id not in self.sessions:
+            if session_id not in self._creating:
+                self.evict(reserve=len(self._creating) + 1)
+                self._creating[session_id] = asyncio.create_task(self._create(session_id))
+            # a cancelled request does not cancel the creation others may wait for
+            await asyncio.shield(self._creating[session_id])
+
+        # evict idle sessions in the background while the service is running
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_eviction())
+
+        session = self.sessions[session_id]
+        session.last_used = time.monotonic()
+        self.sessions.move_to_end(session_id)
+        return session
+
+    async def _create(self, session_id: str) -> Session:
+        try:
+            logger.info(f"Creating session '{session_id}'")
+            session = await asyncio.to_thread(self.create, session_id)
+            self.sessions[session_id] = session
+            return session
+        finally:
+            del self._creating[session_id]
+
+    def close(self, session_id: str) -> None:
+        session = self.sessions.pop(session_id)
+        session.close()
+        for callback in self.on_close:
+            callback(session)
+        logger.info(f"Closed session '{session_id}'")
+
+    def memory_usage(self) -> int:
+        return sum(session.interpreter.memory_usage() for session in self.sessions.values())
+
+    def evict(self, reserve: int = 0) -> list[str]:
+        """Closes idle sessions and, least recently used first, sessions beyond the limits.
+
+        Args:
+            reserve (int): Number of sessions about to be created that count towards
+                `max_sessions`.
+
+        Returns:
+            (list[str]): The ids of the closed sessions.
+        """
+        now = time.monotonic()
+        evicted = [
+            session.id
+            for session in self.sessions.values()
+            if not session.busy and now - session.last_used > self.idle_timeout
+        ]
+        for session_id in evicted:
+            self.close(session_id)
+
+        # read the memory of each session once, closing a session frees its share
+        usage = (
+            {session.id: session.interpreter.memory_usage() for session in self.sessions.values()}
+            if self.memory_limit is not None
+            else {}
+        )
+
+        def over_limit() -> bool:
+            if len(self.sessions) + reserve > self.max_sessions:
+                return True
+            return self.memory_limit is not None and sum(usage.values()) > self.memory_limit
+
+        # sessions are ordered from least to most recently used
+        for session in list(self.sessions.values()):
+            if not over_limit():
+                break
+            if not session.busy:
+                self.close(session.id)
+                usage.pop(session.id, None)
+                evicted.append(session.id)
+
+        return evicted
+
+    async def run_eviction(self) -> None:
+        while len(self.sessions) > 0:
+            await asyncio.sleep(self.eviction_interval)
+            self.evict()
+
+    def shutdown(self) -> None:
+        for session_id in list(self.sessions):
+            self.close(session_id)
@@ -1,5 +1,5 @@
 from functools import cache, cached_property, partial
-from typing import Any, Callable
+from typing import Any, Callable, Iterator
 
 import httpx
 from pydantic import TypeAdapter
@@ -51,16 +51,34 @@ class EnvClient(object):
         return action_infos
 
     def take_action(self, info: ActionInfo, *args: Any, **kwargs: Any) -> Any:
+        if info.streaming:
+            return self.stream_action(info, *args, **kwargs)
+
         action_args = ActionArgs(args=args, kwargs=kwargs)
         response = httpx.post(
             url=f"{self.base_url}/action/take",
             params={"action_id": info.action_id},
             content=action_args.model_dump_json(),
+            headers={"Content-Type": "application/json"},
             timeout=None,
         )
         action_result = ActionResult.model_validate_json(response.content)
         return action_result.result
 
+    def stream_action(self, info: ActionInfo, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        action_args = ActionArgs(args=args, kwargs=kwargs)
+        with httpx.stream(
+            method="POST",
+            url=f"{self.base_url}/action/stream",
+            params={"action_id": info.action_id},
+            content=action_args.model_dump_json(),
+            headers={"Content-Type": "application/json"},
+            timeout=None,
+        ) as response:
+            for line in response.iter_lines():
+                if line != "":
+                    yield ActionResult.model_validate_json(line).result
+
     def action_to_callable(self, info: ActionInfo) -> Callable:
         return partial(self.take_action, info)
 
@@ -15,6 +15,7 @@ class ActionInfo(BaseModel):
     name: str
     description: str
     signature: str
+    streaming: bool = False
 
 
 def deserialize_base64(str_base64: str, dtype: str) -> Any:
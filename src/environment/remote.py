@@ -1,12 +1,15 @@
+import atexit
 import inspect
 from logging import getLogger
-from typing import Any, Callable, ParamSpec, TypeVar
+from typing import Any, Callable, Iterator, ParamSpec, TypeVar
 from uuid import uuid4
 
 from fastapi import Response
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRoute, APIRouter
 
 from .dto import ActionArgs, ActionId, ActionInfo, ActionResult, Const
+from .trace import TraceRecorder
 
 logger = getLogger(__name__)
 
@@ -18,6 +21,7 @@ class RemoteEnv(APIRouter):
         self._registered_consts: list[Const] = []
         self._registered_action_infos: dict[ActionId, ActionInfo] = {}
         self._registered_action_fn: dict[ActionId, Callable] = {}
+        self.recorder: TraceRecorder | None = None
 
         routes = [
             # health
@@ -30,6 +34,7 @@ class RemoteEnv(APIRouter):
             APIRoute(path="/action/ids", endpoint=self.get_action_ids, methods=["GET"]),
             APIRoute(path="/action/info", endpoint=self.get_action_info, methods=["GET"]),
             APIRoute(path="/action/take", endpoint=self.take_action, methods=["POST"]),
+            APIRoute(path="/action/stream", endpoint=self.stream_action, methods=["POST"]),
         ]
 
         super(RemoteEnv, self).__init__(
@@ -60,10 +65,30 @@ class RemoteEnv(APIRouter):
             raise RuntimeError(f"Action id '{action_id}' invalid!")
 
         fn = self._registered_action_fn[action_id]
-        result = fn(*args.args, **args.kwargs)
+        if self.recorder is not None:
+            info = self._registered_action_infos[action_id]
+            result = self.recorder.call(info, args, lambda: fn(*args.args, **args.kwargs))
+        else:
+            result = fn(*args.args, **args.kwargs)
 
         return {"result": result}
 
+    def stream_action(self, action_id: ActionId, args: ActionArgs) -> StreamingResponse:
+        if action_id not in self._registered_action_infos:
+            raise RuntimeError(f"Action id '{action_id}' invalid!")
+
+        fn = self._registered_action_fn[action_id]
+
+        def stream() -> Iterator[str]:
+            items = fn(*args.args, **args.kwargs)
+            if self.recorder is not None:
+                items = self.recorder.stream(self._registered_action_infos[action_id], args, items)
+            # send each yielded item as a separate json line as soon as it is available
+            for item in items:
+                yield ActionResult(result=item).model_dump_json() + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
     P = ParamSpec("P")
     R = TypeVar("T")
 
@@ -75,14 +100,20 @@ class RemoteEnv(APIRouter):
             name=fn.__name__,
             description=fn.__doc__,
             signature=str(inspect.signature(fn)),
+            streaming=inspect.isgeneratorfunction(fn),
         )
+        self._add_action(info, fn)
 
-        self._registered_action_infos[action_id] = info
-        self._registered_action_fn[action_id] = fn
+        return fn
 
-        logger.info(f"Registered Action '{fn.__name__}' with action id '{action_id}'")
+    def _add_action(self, info: ActionInfo, fn: Callable) -> None:
+        self._registered_action_infos[info.action_id] = info
+        self._registered_action_fn[info.action_id] = fn
 
-        return fn
+        if self.recorder is not None:
+            self.recorder.action(info)
+
+        logger.info(f"Registered Action '{info.name}' with action id '{info.action_id}'")
 
     def register_const(self, name: str, value: Any, description: str) -> None:
         const = Const(
@@ -94,3 +125,22 @@ class RemoteEnv(APIRouter):
         self._registered_consts.append(const)
 
         logger.info(f"Registered Constant '{name}={value}'")
+
+    def record(self, file_path: str) -> TraceRecorder:
+        """Records all following action calls to the trace file, see `ReplayEnv`.
+
+        The trace is closed when the app including this router shuts down, or at the
+        latest when the process exits.
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+        self.recorder = TraceRecorder(file_path)
+        self.add_event_handler("shutdown", self.recorder.close)
+        atexit.register(self.recorder.close)
+        self.recorder.header(
+            self.description,
+            self._registered_consts,
+            list(self._registered_action_infos.values()),
+        )
+        logger.info(f"Recording action calls to '{file_path}'")
+        return self.recorder
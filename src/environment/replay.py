@@ -0,0 +1,81 @@
+import time
+from collections import defaultdict, deque
+from logging import getLogger
+from typing import Any, Callable, Iterator
+
+from PIL import Image
+
+from .dto import ActionInfo, Const, validate
+from .remote import RemoteEnv
+from .trace import read_trace
+
+logger = getLogger(__name__)
+
+
+class ReplayEnv(RemoteEnv):
+    """Serves the results recorded in a trace instead of executing any actions.
+
+    The environment exposes the recorded description, constants and actions. Calls to
+    an action return the recorded results of that action in order, after waiting for
+    the recorded duration multiplied by `time_scale`. A time scale of zero replays
+    without any delay.
+    """
+
+    def __init__(self, file_path: str, time_scale: float = 1.0, prefix: str = "") -> None:
+        header, calls = read_trace(file_path)
+        super(ReplayEnv, self).__init__(description=header["description"], prefix=prefix)
+
+        self.time_scale = time_scale
+        self.calls: dict[str, deque[dict]] = defaultdict(deque)
+        for call in calls:
+            self.calls[call["action"]].append(call)
+
+        for const in header["consts"]:
+            self._registered_consts.append(Const(**const))
+        for info in header["actions"]:
+            info = ActionInfo(**info)
+            self._add_action(info, self._replay_fn(info))
+
+    def _next_call(self, name: str, args: tuple, kwargs: dict[str, Any]) -> dict:
+        if len(self.calls[name]) == 0:
+            raise RuntimeError(f"No more recorded calls of action '{name}'")
+
+        call = self.calls[name].popleft()
+        recorded = mask_images([call["args"], call["kwargs"]])
+        if recorded != mask_images([args, kwargs]):
+            # the replayed session diverged from the recorded one
+            logger.warning(f"Arguments of '{name}' differ from the recorded call")
+        return call
+
+    def _replay_fn(self, info: ActionInfo) -> Callable:
+        def replay(*args, **kwargs) -> Any:
+            call = self._next_call(info.name, args, kwargs)
+            time.sleep(call["duration_s"] * self.time_scale)
+            if call["error"] is not None:
+                raise RuntimeError(f"Recorded error: {call['error']}")
+            return validate(call["result"])
+
+        def replay_stream(*args, **kwargs) -> Iterator[Any]:
+            call = self._next_call(info.name, args, kwargs)
+            start = time.monotonic()
+            for item in call["result"]:
+                time.sleep(max(0.0, start + item["offset_s"] * self.time_scale - time.monotonic()))
+                yield validate(item["item"])
+            if call["error"] is not None:
+                raise RuntimeError(f"Recorded error: {call['error']}")
+
+        fn = replay_stream if info.streaming else replay
+        fn.__name__, fn.__doc__ = info.name, info.description
+        return fn
+
+
+def mask_images(obj: Any) -> Any:
+    """Replaces images, decoded or serialized, by a placeholder such that arguments can be
+    compared without decoding. Images are lossy encoded and never compare equal anyway."""
+    if isinstance(obj, Image.Image) or (isinstance(obj, dict) and "str_base64" in obj):
+        return "<image>"
+    elif isinstance(obj, dict):
+        return {k: mask_images(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [mask_images(v) for v in obj]
+    return obj
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from typing import Any
+
+from PIL import Image
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+def image_hash(image: Image.Image) -> str:
+    """Hash of the decoded pixels, independent of the encoding the image was transferred in."""
+    h = hashlib.sha256()
+    h.update(f"{image.mode}:{image.width}x{image.height}:".encode())
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """Disk-backed, size-bounded LRU cache for model responses.
+
+    Entries are stored in a sqlite database such that the cache survives restarts of the
+    environment. Entries older than `ttl` seconds are treated as missing and the least
+    recently used entries are evicted once the total size exceeds `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float | None = 7 * 24 * 60 * 60,
+    ) -> None:
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+        if os.path.dirname(file_path) != "":
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        # the actions are served from a thread pool, guard the connection with a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(file_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        model: str,
+        prompt: str,
+        image: Image.Image | None = None,
+        params: dict[str, Any] | None = None,
+    ) -> str:
+        key = {
+            "model": model,
+            "prompt": prompt,
+            "image": image_hash(image) if image is not None else None,
+            "params": params or {},
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats.hits += 1
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        size = len(key) + len(value.encode())
+
+        if size > self.max_bytes:
+            logger.warning(f"Response of {size} bytes exceeds the cache size, not caching it")
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_bytes:
+            return
+
+        # walk the entries from least to most recently used until enough space is freed
+        evict = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+        self.stats.evictions += len(evict)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            **asdict(self.stats),
+            "hit_rate": self.stats.hit_rate,
+            "entries": len(self),
+            "bytes": self.size(),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
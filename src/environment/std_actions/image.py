@@ -1,6 +1,8 @@
+from functools import cache
+
 import cv2
 import numpy as np
-from PIL import Image, ImageDraw
+from PIL import Image, ImageColor, ImageDraw, ImageFont
 
 
 class ImageActions:
@@ -16,85 +18,93 @@ class ImageActions:
             with coordinates in pixel-space.
         """
 
-        # convert to numpy array
-        image = np.array(image)
-
-        # Threshold the image to create a binary mask
-        binary = ~(image >= 150).all(axis=-1)
-        binary = binary.astype(np.uint8) * 255
-
-        # Find contours of the objects
-        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        # Get bounding boxes
-        bounding_boxes = [cv2.boundingRect(contour) for contour in contours]
-        bounding_boxes = [
-            (min(x, x + w), min(y, y + h), max(x, x + w), max(y, y + h))
-            for (x, y, w, h) in bounding_boxes
-        ]
-
-        # Set thresholds
-        upper_area_threshold = 1000 * 1000  # Define the max area for a bounding box
-        lower_area_threshold = 100 * 100
-
-        min_width = 150
-        min_height = 150
-
-        # Filter boxes by score and area
-        filtered_boxes = []
+        return detect_boxes(np.asarray(image))
 
-        for box in bounding_boxes:
-            # Only include boxes with an area less than the threshold
-            if lower_area_threshold <= compute_area(box) <= upper_area_threshold:
-                filtered_boxes.append(box)
-
-        iou_threshold = 0.6
-        # Remove overlapping boxes with IoU > iou_threshold, keeping only the larger one
-        kept_boxes = []
+    def crop_image(self, image: Image.Image, bbox: tuple[int, int, int, int]) -> Image.Image:
+        """Python function to crop an image to the specified bounding box.
 
-        while len(filtered_boxes) > 0:
-            current_box = filtered_boxes.pop(0)
-            x1, y1, x2, y2 = current_box
+        Args:
+            image (Image.Image): The input image to crop.
+            bbox (tuple[int, int, int, int]): The bounding box (x1, y1, x2, y2) in pixel-space.
 
-            if (abs(x2 - x1) < min_width) or (abs(y2 - y1) < min_height):
-                continue
+        Returns:
+            Image.Image: The cropped image.
+        """
+        return image.crop(bbox)
 
-            for i in range(len(kept_boxes)):
-                ip = intersection_proportion(current_box, kept_boxes[i])
+    def crop_images(
+        self,
+        image: Image.Image,
+        bboxes: list[tuple[int, int, int, int]],
+        padding: int = 0,
+        size: tuple[int, int] | None = None,
+        thumbnail: int | None = None,
+    ) -> list[Image.Image]:
+        """Python function to crop an image to multiple bounding boxes at once.
 
-                if ip > iou_threshold:
-                    # Keep the larger box by comparing areas
-                    current_area = compute_area(current_box)
-                    kept_area = compute_area(kept_boxes[i])
+        Prefer this function over calling `crop_image` once per bounding box.
 
-                    if current_area > kept_area:
-                        # Replace the kept box with the larger current box
-                        kept_boxes[i] = current_box
-                    break
+        Args:
+            image (Image.Image): The input image to crop.
+            bboxes (list[tuple[int, int, int, int]]): The bounding boxes (x1, y1, x2, y2)
+                in pixel-space.
+            padding (int): Number of pixels added around each bounding box. The padded
+                box is clipped to the image borders.
+            size (tuple[int, int] | None): If given, each crop is resized to this fixed
+                (width, height).
+            thumbnail (int | None): If given, each crop is downscaled such that its longest
+                side is at most this many pixels, keeping the aspect ratio. Small thumbnails
+                are well suited as inputs to `prompt_vision_model`.
 
-            else:
-                kept_boxes.append(current_box)
+        Returns:
+            list[Image.Image]: The cropped images in the order of the given bounding boxes.
+        """
+        array = np.asarray(image)
+        return [
+            Image.fromarray(crop_array(array, bbox, padding, size, thumbnail)) for bbox in bboxes
+        ]
 
-        return kept_boxes
+    def detect_and_crop(
+        self,
+        image: Image.Image,
+        padding: int = 0,
+        size: tuple[int, int] | None = None,
+        thumbnail: int | None = None,
+    ) -> list[tuple[tuple[int, int, int, int], Image.Image]]:
+        """Python function to detect objects in the given image and crop them in one step.
 
-    def crop_image(self, image: Image.Image, bbox: tuple[int, int, int, int]) -> Image.Image:
-        """Python function to crop an image to the specified bounding box.
+        This is equivalent to calling `detect_objects` followed by `crop_images` but
+        only transfers the image once.
 
         Args:
-            image (Image.Image): The input image to crop.
-            bbox (tuple[int, int, int, int]): The bounding box (x1, y1, x2, y2) in pixel-space.
+            image (PIL.Image.Image): The image to analyse.
+            padding (int): Number of pixels added around each bounding box. The padded
+                box is clipped to the image borders.
+            size (tuple[int, int] | None): If given, each crop is resized to this fixed
+                (width, height).
+            thumbnail (int | None): If given, each crop is downscaled such that its longest
+                side is at most this many pixels, keeping the aspect ratio.
 
         Returns:
-            Image.Image: The cropped image.
+            (list[tuple[tuple[int, int, int, int], Image.Image]]): A list of pairs of the
+            bounding box (x0, y0, x1, y1) in pixel-space of a detected object and the
+            corresponding cropped image.
         """
-        return image.crop(bbox)
+        array = np.asarray(image)
+        return [
+            (bbox, Image.fromarray(crop_array(array, bbox, padding, size, thumbnail)))
+            for bbox in detect_boxes(array)
+        ]
 
     def draw_bounding_boxes(
         self,
         image: Image.Image,
         bboxes: list[tuple[int, int, int, int]],
-        color: str = "red",
+        color: str | list[str] = "red",
         width: int = 5,
+        labels: list[str] | None = None,
+        show_ids: bool = False,
+        preview: int | None = None,
     ) -> Image.Image:
         """Draws bounding boxes on a given image.
 
@@ -102,23 +112,168 @@ class ImageActions:
             image (Image.Image): The Pillow image to draw on.
             bboxes (list[tuple[int, int, int, int]]): List of bounding boxes in the format
                 (x1, y1, x2, y2).
-            color (str): The color of the bounding box outline.
+            color (str | list[str]): The color of the bounding box outline. Either a single
+                color for all boxes or one color per bounding box.
             width (int): The width of the bounding box outline.
+            labels (list[str] | None): Optional text label per bounding box drawn above
+                the box.
+            show_ids (bool): Whether to draw the index of each bounding box in the list.
+            preview (int | None): If given, the returned image is downscaled such that
+                its longest side is at most this many pixels.
 
         Returns:
             Image.Image: The image with bounding boxes drawn.
         """
-        # Make a copy of the image to avoid modifying the original
-        image_with_boxes = image.copy()
+        # Downscale before drawing such that previews only pay for the small image
+        scale = 1.0
+        if preview is not None and max(image.size) > preview:
+            scale = preview / max(image.size)
+            size = (round(image.width * scale), round(image.height * scale))
+            image_with_boxes = image.resize(size, Image.Resampling.BOX)
+        else:
+            # Make a copy of the image to avoid modifying the original
+            image_with_boxes = image.copy()
+
+        if image_with_boxes.mode != "RGB":
+            image_with_boxes = image_with_boxes.convert("RGB")
+
+        # All boxes are drawn in-place into the same buffer
         draw = ImageDraw.Draw(image_with_boxes)
+        font = load_font()
+        colors = [color] * len(bboxes) if isinstance(color, str) else color
+        width = max(1, round(width * scale))
 
         # Draw each bounding box
-        for bbox in bboxes:
-            draw.rectangle(bbox, outline=color, width=width)
+        for i, (bbox, c) in enumerate(zip(bboxes, colors, strict=True)):
+            bbox = tuple(v * scale for v in bbox)
+            draw.rectangle(bbox, outline=c, width=width)
+
+            # Draw the id and label of the box
+            text = []
+            if show_ids:
+                text.append(str(i))
+            if labels is not None:
+                text.append(labels[i])
+            if len(text) > 0:
+                draw_label(draw, bbox, " ".join(text), c, font)
 
         return image_with_boxes
 
 
+def detect_boxes(image: np.ndarray) -> list[tuple[int, int, int, int]]:
+    # Threshold the image to create a binary mask
+    binary = ~(image >= 150).all(axis=-1)
+    binary = binary.astype(np.uint8) * 255
+
+    # Find contours of the objects
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    # Get bounding boxes
+    bounding_boxes = [cv2.boundingRect(contour) for contour in contours]
+    bounding_boxes = [
+        (min(x, x + w), min(y, y + h), max(x, x + w), max(y, y + h))
+        for (x, y, w, h) in bounding_boxes
+    ]
+
+    # Set thresholds
+    upper_area_threshold = 1000 * 1000  # Define the max area for a bounding box
+    lower_area_threshold = 100 * 100
+
+    min_width = 150
+    min_height = 150
+
+    # Filter boxes by score and area
+    filtered_boxes = []
+
+    for box in bounding_boxes:
+        # Only include boxes with an area less than the threshold
+        if lower_area_threshold <= compute_area(box) <= upper_area_threshold:
+            filtered_boxes.append(box)
+
+    iou_threshold = 0.6
+    # Remove overlapping boxes with IoU > iou_threshold, keeping only the larger one
+    kept_boxes = []
+
+    while len(filtered_boxes) > 0:
+        current_box = filtered_boxes.pop(0)
+        x1, y1, x2, y2 = current_box
+
+        if (abs(x2 - x1) < min_width) or (abs(y2 - y1) < min_height):
+            continue
+
+        for i in range(len(kept_boxes)):
+            ip = intersection_proportion(current_box, kept_boxes[i])
+
+            if ip > iou_threshold:
+                # Keep the larger box by comparing areas
+                current_area = compute_area(current_box)
+                kept_area = compute_area(kept_boxes[i])
+
+                if current_area > kept_area:
+                    # Replace the kept box with the larger current box
+                    kept_boxes[i] = current_box
+                break
+
+        else:
+            kept_boxes.append(current_box)
+
+    return kept_boxes
+
+
+def crop_array(
+    image: np.ndarray,
+    bbox: tuple[int, int, int, int],
+    padding: int = 0,
+    size: tuple[int, int] | None = None,
+    thumbnail: int | None = None,
+) -> np.ndarray:
+    height, width = image.shape[:2]
+    # pad and clip the box to the image borders
+    x1, y1, x2, y2 = (int(round(v)) for v in bbox)
+    x1, x2 = max(0, min(x1, x2) - padding), min(width, max(x1, x2) + padding)
+    y1, y2 = max(0, min(y1, y2) - padding), min(height, max(y1, y2) + padding)
+    # slicing returns a view, only resizing allocates a new buffer
+    crop = image[y1:y2, x1:x2]
+
+    if crop.size == 0:
+        return crop
+
+    if size is not None:
+        return cv2.resize(crop, tuple(size), interpolation=cv2.INTER_AREA)
+
+    if thumbnail is not None and max(crop.shape[:2]) > thumbnail:
+        scale = thumbnail / max(crop.shape[:2])
+        dsize = (max(1, round(crop.shape[1] * scale)), max(1, round(crop.shape[0] * scale)))
+        return cv2.resize(crop, dsize, interpolation=cv2.INTER_AREA)
+
+    return crop
+
+
+@cache
+def load_font() -> ImageFont.ImageFont | ImageFont.FreeTypeFont:
+    # the bitmap font renders an order of magnitude faster than the default truetype font
+    if hasattr(ImageFont, "load_default_imagefont"):
+        return ImageFont.load_default_imagefont()
+    return ImageFont.load_default()
+
+
+def draw_label(
+    draw: ImageDraw.ImageDraw,
+    bbox: tuple[float, float, float, float],
+    text: str,
+    color: str,
+    font: ImageFont.ImageFont | ImageFont.FreeTypeFont,
+) -> None:
+    x, y = min(bbox[0], bbox[2]), min(bbox[1], bbox[3])
+    left, top, right, bottom = draw.textbbox((x, y), text, font=font)
+    # place the label above the box or inside it if there is no space left
+    offset = min(bottom - top + 2, y)
+    draw.rectangle((left - 1, top - offset - 1, right + 1, bottom - offset + 1), fill=color)
+    # pick black or white text depending on the brightness of the background
+    text_color = "black" if sum(ImageColor.getrgb(color)[:3]) > 382 else "white"
+    draw.text((x, y - offset), text, fill=text_color, font=font)
+
+
 def compute_area(box):
     width = box[2] - box[0]
     height = box[3] - box[1]
@@ -0,0 +1,115 @@
+import math
+from dataclasses import dataclass, field
+from typing import Literal
+
+import numpy as np
+from llama_index.core.schema import ImageDocument
+from PIL import Image
+
+from environment.std_actions.image import crop_array
+from environment.utils import pil_image_to_base64
+
+ImageDetail = Literal["low", "high", "auto"]
+
+# the model never looks at more pixels than this, sending larger images only costs time
+LOW_DETAIL_SIDE = 512
+HIGH_DETAIL_MAX_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+
+
+@dataclass
+class PreprocessConfig:
+    # upper bound on the longest image side, applied before any detail specific resizing
+    max_side: int | None = HIGH_DETAIL_MAX_SIDE
+    # split high detail images into tiles which are sent alongside a low detail overview
+    tile: bool = False
+    tile_size: int = 512
+    max_tiles: int = 6
+    jpeg_quality: int = 75
+
+
+@dataclass
+class PreparedImages:
+    documents: list[ImageDocument]
+    detail: Literal["low", "high"]
+    original_size: tuple[int, int]
+    sizes: list[tuple[int, int]] = field(default_factory=list)
+    bytes_sent: int = 0
+
+
+def resize_to_max_side(image: Image.Image, max_side: int | None) -> Image.Image:
+    if max_side is None or max(image.size) <= max_side:
+        return image
+    scale = max_side / max(image.size)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.BOX)
+
+
+def resize_for_detail(image: Image.Image, detail: Literal["low", "high"]) -> Image.Image:
+    if detail == "low":
+        return resize_to_max_side(image, LOW_DETAIL_SIDE)
+
+    # high detail images are scaled to fit a 2048 square and then to a short side of 768
+    image = resize_to_max_side(image, HIGH_DETAIL_MAX_SIDE)
+    if min(image.size) > HIGH_DETAIL_SHORT_SIDE:
+        scale = HIGH_DETAIL_SHORT_SIDE / min(image.size)
+        size = (round(image.width * scale), round(image.height * scale))
+        image = image.resize(size, Image.Resampling.BOX)
+    return image
+
+
+def select_detail(image: Image.Image, detail: ImageDetail) -> Literal["low", "high"]:
+    if detail == "auto":
+        return "low" if max(image.size) <= LOW_DETAIL_SIDE else "high"
+    return detail
+
+
+def tile_image(image: Image.Image, tile_size: int, max_tiles: int) -> list[Image.Image]:
+    # grow the tiles until the grid fits into the tile budget
+    cols = math.ceil(image.width / tile_size)
+    rows = math.ceil(image.height / tile_size)
+    while cols * rows > max_tiles:
+        tile_size = math.ceil(tile_size * 1.25)
+        cols = math.ceil(image.width / tile_size)
+        rows = math.ceil(image.height / tile_size)
+
+    array = np.asarray(image)
+    tile_width, tile_height = math.ceil(image.width / cols), math.ceil(image.height / rows)
+    return [
+        Image.fromarray(
+            crop_array(
+                array,
+                (c * tile_width, r * tile_height, (c + 1) * tile_width, (r + 1) * tile_height),
+            )
+        )
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+def preprocess_image(
+    image: Image.Image, config: PreprocessConfig, detail: ImageDetail
+) -> PreparedImages:
+    original_size = image.size
+    image = resize_to_max_side(image, config.max_side)
+    selected = select_detail(image, detail)
+
+    if selected == "high" and config.tile:
+        # a low resolution overview followed by the full resolution tiles
+        images = [resize_for_detail(image, "low")]
+        images += [
+            resize_for_detail(tile, "high")
+            for tile in tile_image(image, config.tile_size, config.max_tiles)
+        ]
+    else:
+        images = [resize_for_detail(image, selected)]
+
+    encoded = [pil_image_to_base64(img, quality=config.jpeg_quality) for img in images]
+
+    return PreparedImages(
+        documents=[ImageDocument(image=str_base64) for str_base64 in encoded],
+        detail=selected,
+        original_size=original_size,
+        sizes=[img.size for img in images],
+        bytes_sent=sum(len(str_base64) for str_base64 in encoded),
+    )
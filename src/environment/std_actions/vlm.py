@@ -1,30 +1,414 @@
-from llama_index.core.schema import ImageDocument
+import asyncio
+import json
+from collections import deque
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from time import perf_counter
+from typing import Any, Iterator, Literal
+
+from llama_index.core.bridge.pydantic import PrivateAttr
 from llama_index.multi_modal_llms.openai import OpenAIMultiModal
+from openai import AsyncOpenAI
 from PIL import Image
 
-from environment.utils import pil_image_to_base64
+from environment.std_actions.cache import ResponseCache
+from environment.std_actions.preprocess import (
+    ImageDetail,
+    PreparedImages,
+    PreprocessConfig,
+    preprocess_image,
+)
+
+logger = getLogger(__name__)
+
+PACKED_PROMPT = """{prompt}
+
+You are given {n} images. Answer the above for each image separately and independently. Respond only with a JSON list of exactly {n} strings, where the i-th string is the answer for the i-th image."""  # noqa: E501
+
+
+@dataclass
+class VisionRequestStats:
+    detail: str | None
+    original_size: tuple[int, int] | None
+    sizes: list[tuple[int, int]]
+    bytes_sent: int
+    latency: float
+    cached: bool = False
 
 
 class VisionLanguageModelAction(OpenAIMultiModal):
-    def prompt_vision_model(self, prompt: str, image: Image.Image | None = None) -> str:
+    _cache: ResponseCache | None = PrivateAttr(default=None)
+    _preprocessing: PreprocessConfig = PrivateAttr(default_factory=PreprocessConfig)
+    _request_stats: deque[VisionRequestStats] = PrivateAttr(
+        default_factory=lambda: deque(maxlen=1000)
+    )
+    _max_concurrency: int = PrivateAttr(default=8)
+
+    def __init__(
+        self,
+        cache: ResponseCache | None = None,
+        preprocessing: PreprocessConfig | None = None,
+        max_concurrency: int = 8,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._cache = cache
+        self._preprocessing = preprocessing or PreprocessConfig()
+        self._max_concurrency = max_concurrency
+
+    @property
+    def cache(self) -> ResponseCache | None:
+        return self._cache
+
+    @property
+    def preprocessing(self) -> PreprocessConfig:
+        return self._preprocessing
+
+    def generation_params(self, detail: ImageDetail) -> dict[str, Any]:
+        return {
+            "temperature": self.temperature,
+            "max_new_tokens": self.max_new_tokens,
+            "image_detail": detail,
+            "additional_kwargs": self.additional_kwargs,
+            "preprocessing": asdict(self._preprocessing),
+        }
+
+    def get_request_stats(self) -> list[dict[str, Any]]:
+        return [asdict(stats) for stats in self._request_stats]
+
+    def prompt_vision_model(
+        self, prompt: str, image: Image.Image | None = None, detail: ImageDetail | None = None
+    ) -> str:
         """Python function used to prompt a vision language model to get detailed
         descriptions of images or objects in images.
 
         Args:
             prompt (str): The prompt for the LLM.
             image (PIL.Image.Imagel): An image that is given to the LLM.
+            detail (str | None): The level of detail the image is looked at, one of "low",
+                "high" or "auto". Low detail is considerably faster, use high detail only
+                for questions about small details. Defaults to the model's configuration.
 
         Returns:
             str: The response completion of the LLM.
         """
+        start = perf_counter()
+        detail = detail or self.image_detail
+
+        # Answer repeated questions about the same image from the cache
+        key, text = self._cache_lookup(prompt, image, detail)
+        if text is not None:
+            self._record_cached(image, start)
+            return text
+
         # If an image is provided, process with both image and text
         if image is not None:
-            image_doc = ImageDocument(image=pil_image_to_base64(image))
+            # Downscale and optionally tile the image before sending it
+            prepared = preprocess_image(image, self._preprocessing, detail)
             # Use LLMImageResponse to send both the prompt and image
-            response = self.complete(prompt=prompt, image_documents=[image_doc])
+            response = self._with_detail(prepared.detail).complete(
+                prompt=prompt, image_documents=prepared.documents
+            )
         else:
             # Only send the text prompt
-            response = self.complete(prompt=prompt)
+            prepared = None
+            response = self.complete(prompt=prompt, image_documents=[])
+
+        self._record(prepared, start)
+
+        if key is not None:
+            self._cache.put(key, response.text)
 
         # Retrieve the LLM's response text
         return response.text
+
+    def stream_vision_model(
+        self, prompt: str, image: Image.Image | None = None, detail: ImageDetail | None = None
+    ) -> Iterator[str]:
+        """Python function used to prompt a vision language model like `prompt_vision_model`
+        but yields the response in chunks as soon as they are generated.
+
+        Use this function for long responses, e.g. detailed descriptions, to process or
+        print the response while it is still being generated.
+
+        Args:
+            prompt (str): The prompt for the LLM.
+            image (PIL.Image.Image): An image that is given to the LLM.
+            detail (str | None): The level of detail the image is looked at, one of "low",
+                "high" or "auto". Defaults to the model's configuration.
+
+        Yields:
+            str: The next chunk of the response completion of the LLM.
+        """
+        start = perf_counter()
+        detail = detail or self.image_detail
+
+        key, text = self._cache_lookup(prompt, image, detail)
+        if text is not None:
+            self._record_cached(image, start)
+            yield text
+            return
+
+        if image is not None:
+            prepared = preprocess_image(image, self._preprocessing, detail)
+            responses = self._with_detail(prepared.detail).stream_complete(
+                prompt=prompt, image_documents=prepared.documents
+            )
+        else:
+            prepared = None
+            responses = self.stream_complete(prompt=prompt, image_documents=[])
+
+        text = ""
+        for response in responses:
+            if response.delta:
+                if text == "":
+                    logger.info(f"VLM time to first token {perf_counter() - start:.2f}s")
+                text += response.delta
+                yield response.delta
+
+        self._record(prepared, start)
+
+        if key is not None:
+            self._cache.put(key, text)
+
+    def prompt_vision_model_batch(
+        self,
+        prompt: str,
+        images: list[Image.Image],
+        detail: ImageDetail | None = None,
+        mode: Literal["concurrent", "packed"] = "concurrent",
+        timeout: float | None = 60.0,
+        pack_size: int = 4,
+    ) -> list[str | None]:
+        """Python function used to prompt a vision language model with the same prompt for
+        many images at once, e.g. to classify all cropped objects of an image.
+
+        This is much faster than calling `prompt_vision_model` for each image in a loop.
+
+        Args:
+            prompt (str): The prompt for the LLM, asked for every image separately.
+            images (list[PIL.Image.Image]): The images that are given to the LLM.
+            detail (str | None): The level of detail the images are looked at, one of
+                "low", "high" or "auto". Defaults to the model's configuration.
+            mode (str): Either "concurrent" to send one request per image in parallel or
+                "packed" to send up to `pack_size` images within a single request.
+            timeout (float | None): Timeout in seconds of each single request.
+            pack_size (int): The number of images per request in "packed" mode.
+
+        Returns:
+            list[str | None]: The response completion of the LLM for each image in the
+            order of the given images. An entry is None if its request failed or timed out.
+        """
+        detail = detail or self.image_detail
+        return asyncio.run(self._aprompt_batch(prompt, images, detail, mode, timeout, pack_size))
+
+    async def _aprompt_batch(
+        self,
+        prompt: str,
+        images: list[Image.Image],
+        detail: ImageDetail,
+        mode: Literal["concurrent", "packed"],
+        timeout: float | None,
+        pack_size: int,
+    ) -> list[str | None]:
+        # The async client is bound to the event loop it is first used in, so every batch
+        # gets its own client
+        llm = self.model_copy()
+        llm._aclient = AsyncOpenAI(**self._get_credential_kwargs())
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        try:
+            if mode == "concurrent":
+                return await asyncio.gather(
+                    *[
+                        llm._aprompt_single(prompt, image, detail, semaphore, timeout)
+                        for image in images
+                    ]
+                )
+
+            elif mode == "packed":
+                # Only pack the images that are not answered by the cache
+                results: list[str | None] = [None] * len(images)
+                missing = []
+                for i, image in enumerate(images):
+                    start = perf_counter()
+                    _, results[i] = self._cache_lookup(prompt, image, detail, packed=True)
+                    if results[i] is None:
+                        missing.append(i)
+                    else:
+                        self._record_cached(image, start)
+
+                chunks = [missing[i : i + pack_size] for i in range(0, len(missing), pack_size)]
+                answers = await asyncio.gather(
+                    *[
+                        llm._aprompt_packed(
+                            prompt, [images[i] for i in chunk], detail, semaphore, timeout
+                        )
+                        for chunk in chunks
+                    ]
+                )
+                for chunk, chunk_answers in zip(chunks, answers, strict=True):
+                    for i, answer in zip(chunk, chunk_answers, strict=True):
+                        results[i] = answer
+
+                return results
+
+            else:
+                raise ValueError(f"Unknown batch mode '{mode}'")
+
+        finally:
+            await llm._aclient.close()
+
+    async def _aprompt_single(
+        self,
+        prompt: str,
+        image: Image.Image,
+        detail: ImageDetail,
+        semaphore: asyncio.Semaphore,
+        timeout: float | None,
+        lookup: bool = True,
+    ) -> str | None:
+        start = perf_counter()
+
+        # without lookup, the caller already missed the cache for this image
+        key, text = self._cache_lookup(prompt, image, detail, count=lookup)
+        if text is not None:
+            self._record_cached(image, start)
+            return text
+
+        async with semaphore:
+            prepared = await asyncio.to_thread(preprocess_image, image, self._preprocessing, detail)
+            try:
+                response = await asyncio.wait_for(
+                    self._with_detail(prepared.detail).acomplete(
+                        prompt=prompt, image_documents=prepared.documents
+                    ),
+                    timeout=timeout,
+                )
+            except Exception as e:
+                logger.warning(f"VLM request failed: {e!r}")
+                return None
+
+        self._record(prepared, start)
+
+        if key is not None:
+            self._cache.put(key, response.text)
+
+        return response.text
+
+    async def _aprompt_packed(
+        self,
+        prompt: str,
+        images: list[Image.Image],
+        detail: ImageDetail,
+        semaphore: asyncio.Semaphore,
+        timeout: float | None,
+    ) -> list[str | None]:
+        start = perf_counter()
+
+        async with semaphore:
+            prepared = await asyncio.to_thread(
+                lambda: [preprocess_image(image, self._preprocessing, detail) for image in images]
+            )
+            request_detail = "high" if any(p.detail == "high" for p in prepared) else "low"
+            try:
+                response = await asyncio.wait_for(
+                    self._with_detail(request_detail).acomplete(
+                        prompt=PACKED_PROMPT.format(prompt=prompt, n=len(images)),
+                        image_documents=[doc for p in prepared for doc in p.documents],
+                    ),
+                    timeout=timeout,
+                )
+                answers = parse_packed_response(response.text, len(images))
+            except Exception as e:
+                logger.warning(f"Packed VLM request failed, falling back to single requests: {e!r}")
+                answers = None
+
+        if answers is None:
+            return await asyncio.gather(
+                *[
+                    self._aprompt_single(prompt, image, detail, semaphore, timeout, lookup=False)
+                    for image in images
+                ]
+            )
+
+        for p in prepared:
+            self._record(p, start)
+
+        for image, answer in zip(images, answers, strict=True):
+            key, _ = self._cache_lookup(prompt, image, detail, count=False, packed=True)
+            if key is not None:
+                self._cache.put(key, answer)
+
+        return answers
+
+    def _with_detail(self, detail: str) -> OpenAIMultiModal:
+        # The image detail is a model-wide setting, use a shallow copy to change it per request
+        if detail == self.image_detail:
+            return self
+        return self.model_copy(update={"image_detail": detail})
+
+    def _cache_lookup(
+        self,
+        prompt: str,
+        image: Image.Image | None,
+        detail: ImageDetail,
+        count: bool = True,
+        packed: bool = False,
+    ) -> tuple[str | None, str | None]:
+        if self._cache is None:
+            return None, None
+
+        params = self.generation_params(detail)
+        if packed:
+            # Answers split from a packed reply are kept apart from the answers to the
+            # plain prompt
+            params["mode"] = "packed"
+        key = ResponseCache.make_key(self.model, prompt, image, params)
+        if not count:
+            return key, None
+
+        text = self._cache.get(key)
+        if text is not None:
+            logger.info(f"VLM cache hit (hit rate {self._cache.stats.hit_rate:.2f})")
+        return key, text
+
+    def _record(self, prepared: PreparedImages | None, start: float) -> None:
+        stats = VisionRequestStats(
+            detail=prepared.detail if prepared is not None else None,
+            original_size=prepared.original_size if prepared is not None else None,
+            sizes=prepared.sizes if prepared is not None else [],
+            bytes_sent=prepared.bytes_sent if prepared is not None else 0,
+            latency=perf_counter() - start,
+        )
+        self._request_stats.append(stats)
+        logger.info(
+            f"VLM request with {len(stats.sizes)} image(s) of {stats.bytes_sent} bytes "
+            f"at {stats.detail} detail took {stats.latency:.2f}s"
+        )
+
+    def _record_cached(self, image: Image.Image | None, start: float) -> None:
+        self._request_stats.append(
+            VisionRequestStats(
+                detail=None,
+                original_size=image.size if image is not None else None,
+                sizes=[],
+                bytes_sent=0,
+                latency=perf_counter() - start,
+                cached=True,
+            )
+        )
+
+
+def parse_packed_response(text: str, n: int) -> list[str]:
+    # strip markdown code fences the model likes to wrap json into
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+
+    answers = json.loads(text)
+    if not isinstance(answers, list) or len(answers) != n:
+        raise ValueError(f"Expected a list of {n} answers, got: {text!r}")
+
+    return [str(answer) for answer in answers]
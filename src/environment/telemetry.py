@@ -0,0 +1,103 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any, Callable
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.routing import APIRouter
+
+logger = getLogger(__name__)
+
+
+@dataclass(eq=False)
+class Subscriber:
+    # forward every n-th sample only
+    decimation: int
+    # holds only the newest update, older ones are dropped if the consumer is too slow
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=1))
+    sent: int = 0
+    dropped: int = 0
+
+
+class TelemetryRouter(APIRouter):
+    """Publishes samples of a state over a WebSocket at a fixed rate.
+
+    The state is sampled and encoded once per tick, independent of the number of
+    subscribers. Each subscriber can ask for a lower rate, in which case only every
+    n-th sample is forwarded to it.
+    """
+
+    def __init__(
+        self,
+        sample: Callable[[], dict[str, Any]],
+        rate: float = 30.0,
+        path: str = "/telemetry",
+        prefix: str = "",
+    ) -> None:
+        super(TelemetryRouter, self).__init__(prefix=prefix)
+        self.sample = sample
+        self.rate = rate
+        self.subscribers: set[Subscriber] = set()
+        self._task: asyncio.Task | None = None
+
+        self.add_api_websocket_route(path, self.subscribe)
+
+    async def subscribe(self, websocket: WebSocket, rate: float | None = None) -> None:
+        await websocket.accept()
+
+        rate = min(rate or self.rate, self.rate)
+        subscriber = Subscriber(decimation=max(1, round(self.rate / rate)))
+        self.subscribers.add(subscriber)
+
+        # sample only while someone is listening
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.publish())
+
+        try:
+            while True:
+                await websocket.send_text(await subscriber.queue.get())
+                subscriber.sent += 1
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            logger.info(
+                f"Telemetry subscriber disconnected after {subscriber.sent} updates "
+                f"({subscriber.dropped} dropped)"
+            )
+
+    async def publish(self) -> None:
+        interval = 1.0 / self.rate
+        tick = 0
+        next_tick = time.monotonic()
+
+        while len(self.subscribers) > 0:
+            try:
+                message = encode({"seq": tick, "t": round(time.time(), 3), **self.sample()})
+            except Exception:
+                logger.exception("Failed to sample telemetry")
+                message = None
+
+            for subscriber in list(self.subscribers) if message is not None else []:
+                if tick % subscriber.decimation != 0:
+                    continue
+                if subscriber.queue.full():
+                    # replace the update the consumer did not pick up in time
+                    subscriber.queue.get_nowait()
+                    subscriber.dropped += 1
+                subscriber.queue.put_nowait(message)
+
+            tick += 1
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+
+def encode(sample: dict[str, Any]) -> str:
+    return json.dumps(sample, separators=(",", ":"))
+
+
+def bitmask(values: list[bool]) -> int:
+    """Packs a list of digital I/O states into a single integer, bit i is values[i]."""
+    return sum(1 << i for i, v in enumerate(values) if v)
@@ -0,0 +1,142 @@
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from logging import getLogger
+from typing import IO, Any, Callable, Iterator
+
+from .dto import ActionArgs, ActionInfo, Const, serialize
+
+logger = getLogger(__name__)
+
+
+def open_trace(file_path: str, mode: str) -> IO[str]:
+    # traces ending in .gz are compressed, images are already stored as base64 JPEGs
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, mode + "t", encoding="utf-8")
+    return open(file_path, mode, encoding="utf-8")
+
+
+def trace_path(file_path: str, name: str) -> str:
+    """The trace file of one of several environments recording with the same path, e.g.
+    `trace.robot.jsonl.gz` for `trace.jsonl.gz`."""
+    directory, file_name = os.path.split(file_path)
+    stem, dot, extension = file_name.partition(".")
+    return os.path.join(directory, f"{stem}.{name}{dot}{extension}")
+
+
+class TraceRecorder:
+    """Records action calls to a trace file with one JSON object per line.
+
+    The first line is a header with the environment description, constants and
+    actions. Every call is recorded with its arguments, result or error, the time
+    it started at relative to the start of the recording and its duration. Entries
+    are serialized and written on a background thread, off the request path.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.start = time.monotonic()
+        self._queue: queue.Queue[dict | None] = queue.Queue()
+        self._file = open_trace(file_path, "w")
+        self._closed = False
+        self._thread = threading.Thread(target=self._write, name="TraceRecorder", daemon=True)
+        self._thread.start()
+
+    def header(self, description: str, consts: list[Const], infos: list[ActionInfo]) -> None:
+        self._queue.put(
+            {
+                "type": "header",
+                "description": description,
+                "consts": [c.model_dump() for c in consts],
+                "actions": [info.model_dump() for info in infos],
+            }
+        )
+
+    def action(self, info: ActionInfo) -> None:
+        # actions registered after the recording started
+        self._queue.put({"type": "action", "info": info.model_dump()})
+
+    def call(self, info: ActionInfo, args: ActionArgs, fn: Callable[[], Any]) -> Any:
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            self._record(info, args, start, error=repr(e))
+            raise
+        self._record(info, args, start, result=result)
+        return result
+
+    def stream(self, info: ActionInfo, args: ActionArgs, items: Iterator[Any]) -> Iterator[Any]:
+        start = time.monotonic()
+        recorded = []
+        error = None
+        try:
+            for item in items:
+                # the time at which each item was produced, relative to the call
+                recorded.append({"offset_s": time.monotonic() - start, "item": item})
+                yield item
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            # also record the items sent so far if the client stopped the stream early
+            self._record(info, args, start, result=recorded, error=error)
+
+    def _record(
+        self,
+        info: ActionInfo,
+        args: ActionArgs,
+        start: float,
+        result: Any = None,
+        error: str | None = None,
+    ) -> None:
+        self._queue.put(
+            {
+                "type": "call",
+                "action": info.name,
+                "streaming": info.streaming,
+                "args": args.args,
+                "kwargs": args.kwargs,
+                "result": result,
+                "error": error,
+                "start_s": start - self.start,
+                "duration_s": time.monotonic() - start,
+            }
+        )
+
+    def _write(self) -> None:
+        while (entry := self._queue.get()) is not None:
+            try:
+                line = json.dumps(serialize(entry), separators=(",", ":"), default=str)
+                self._file.write(line + "\n")
+                # flush in batches, every flush also ends a compressed block
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception:
+                logger.exception(f"Failed to record {entry.get('action')} to trace")
+        self._file.close()
+
+    def close(self) -> None:
+        """Writes the queued entries and finalizes the trace file."""
+        if self._closed:
+            return
+        self._closed = True
+        # the writer drains the queue up to the sentinel before it closes the file
+        self._queue.put(None)
+        self._thread.join()
+
+
+def read_trace(file_path: str) -> tuple[dict, list[dict]]:
+    """Returns the header and the calls of a trace."""
+    with open_trace(file_path, "r") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+
+    header = next((e for e in entries if e["type"] == "header"), None)
+    if header is None:
+        raise ValueError(f"Trace {file_path} has no header")
+    header["actions"] += [e["info"] for e in entries if e["type"] == "action"]
+
+    return header, [e for e in entries if e["type"] == "call"]
@@ -4,7 +4,7 @@ from io import BytesIO
 from PIL import Image
 
 
-def pil_image_to_base64(image: Image.Image) -> str:
+def pil_image_to_base64(image: Image.Image, quality: int = 75) -> str:
     # Convert image to RGB if it has an alpha channel (RGBA)
     if image.mode == "RGBA":
         image = image.convert("RGB")
@@ -12,7 +12,7 @@ def pil_image_to_base64(image: Image.Image) -> str:
     # Create an in-memory buffer to save the image
     buffer = BytesIO()
     # Save the image to the buffer in a specific format (e.g., JPEG)
-    image.save(buffer, format="JPEG")
+    image.save(buffer, format="JPEG", quality=quality)
     # Get the binary data from the buffer
     image_bytes = buffer.getvalue()
     # Encode the binary data to a base64 string
@@ -1,49 +1,157 @@
+from __future__ import annotations
+
+import math
+import threading
 import time
 from atexit import register
-from time import sleep
-from typing import Callable
+from typing import TYPE_CHECKING, Any, Callable
 
 import cv2
-import numpy as np
-from cri_lib import CRIController
 from PIL import Image
 
+from environment.telemetry import bitmask
+from robot.camera import CameraSource, FrameGrabber, OpenCVCamera
+from robot.motion import MotionExecutor, exclusive
+from robot.planner import CostModel, plan_order
+from robot.prefetch import BoundingBox, PerceptionPrefetcher
+from robot.preprocessing import ColorConvert, ContrastStretch, PreprocessingPipeline
+from robot.state import MotionState
+from robot.waits import WaitRecorder
+
+if TYPE_CHECKING:
+    from cri_lib import CRIController
+
 
 class RobotActions(object):
-    def __init__(self, ip: str = "192.168.3.11", device_id: int = 0) -> None:
+    def __init__(
+        self,
+        ip: str = "192.168.3.11",
+        device_id: int = 0,
+        camera: CameraSource | None = None,
+        preprocessing: PreprocessingPipeline | None = None,
+        gripper_feedback: int | None = None,
+        controller: CRIController | None = None,
+        prefetch: bool = False,
+        detector: Callable[[Image.Image], list[BoundingBox]] | None = None,
+        main_workspace: tuple[float, float, float, float] = (190, -250, 400, 250),
+        serving_workspace: tuple[float, float, float, float] = (-200, 250, 100, 400),
+        transition_point: tuple[float, float] = (200, 350),
+        camera_pose: tuple[float, float, float] = (200, 0, 350),
+        clearing_point: tuple[float, float] = (200, 0),
+        blending: bool = False,
+    ) -> None:
         self.velocity = 100
+        # speed override in percent applied by the controller to all moves
+        self.override = 90.0
         self.move_height = 150
-        # connect to camera
+        self.grab_height = 65
+        self.release_height = 100
+        # connect to camera and continuously grab and preprocess frames in the background
         self.device_id = device_id
-        self.cap = cv2.VideoCapture(self.device_id)
-        if not self.cap.isOpened():
-            raise ConnectionError(f"Could not connect to webcam with device_id={device_id}")
-
-        # connect to robot
-        self.controller = CRIController()
+        self.preprocessing = preprocessing or PreprocessingPipeline(
+            [ColorConvert(cv2.COLOR_BGR2RGB), ContrastStretch()]
+        )
+        self.grabber = FrameGrabber(
+            camera or OpenCVCamera(self.device_id), process=self.preprocessing
+        )
+        self.grabber.start()
+
+        # digital input that is high while the gripper holds an object, if wired up
+        self.gripper_feedback = gripper_feedback
+        # fixed waits used where the hardware provides no feedback, and timeouts otherwise
+        self.enable_time, self.enable_timeout = 3.0, 10.0
+        self.grab_time, self.release_time, self.gripper_timeout = 0.5, 1.0, 2.0
+        self.waits = WaitRecorder()
+
+        # all motions hold this lock, the arm only ever executes one of them at a time
+        self.motion_lock = threading.RLock()
+        self.motions = MotionExecutor(self.motion_lock, on_cancel=self.stop_motion)
+        # pose and gripper state, falls back to the commanded pose if the position is unknown
+        self.state = MotionState(self.read_position)
+
+        self.main_workspace = main_workspace
+        self.serving_workspace = serving_workspace
+        # moves between the workspaces pass this point
+        self.transition_point = transition_point
+        # (x, y) position the arm returns to in order to clear the workspace
+        self.clearing_point = clearing_point
+        # pose at which images of the workspace are taken
+        self.camera_pose = camera_pose
+        # object detection used by capture_and_detect, e.g. a std environment action, the
+        # default one is loaded on first use
+        self.detector = detector
+        # capture and analyse an image in the background whenever the arm comes to rest at
+        # the camera pose
+        self.prefetcher = None
+        if prefetch:
+            self.prefetcher = PerceptionPrefetcher(
+                self.take_image, self.detect, is_valid=self.state.is_settled
+            )
+
+        # connect to robot, a different controller such as a simulation can be passed in
+        if controller is None:
+            # only required for real hardware, simulations run without the robot library
+            from cri_lib import CRIController
+
+            controller = CRIController()
+        self.controller = controller
         self.controller.connect(ip)
         # setup
         self.setup_robot()
         register(self.shutdown)
 
-        self.main_workspace = (190, -250, 400, 250)
-        self.serving_workspace = (-200, 250, 100, 400)
+        # queue path segments such that the controller blends them instead of stopping,
+        # this relies on the controller queuing moves sent without waiting for the previous
+        # one, which is verified for the simulation only
+        self.blending = blending
 
         self.reset()
 
     def setup_robot(self) -> None:
         self.controller.set_active_control(True)
         self.controller.enable()
-        time.sleep(3)
-        self.controller.wait_for_kinematics_ready()
-        self.controller.set_override(90.0)
-
-    def get_position(self):
-        return (
-            self.controller.robot_state.position_robot.X,
-            self.controller.robot_state.position_robot.Y,
-            self.controller.robot_state.position_robot.Z,
+        # wait for the drives to come up, older controller states have no kinematics state
+        # to wait on and get the fixed enable time instead
+        has_state = hasattr(self.controller.robot_state, "kinematics_state")
+        self.waits.wait(
+            "enable",
+            self.kinematics_ready if has_state else None,
+            timeout=self.enable_timeout,
+            fallback=self.enable_time,
         )
+        self.controller.set_override(self.override)
+
+    def kinematics_ready(self) -> bool:
+        return self.controller.robot_state.kinematics_state.name == "NO_ERROR"
+
+    def gripper_holds_object(self) -> bool:
+        return self.controller.robot_state.din[self.gripper_feedback]
+
+    def gripper_released(self) -> bool:
+        return not self.gripper_holds_object()
+
+    def read_position(self) -> tuple[float, float, float]:
+        # read a single snapshot, the controller updates the state concurrently
+        pos = self.controller.robot_state.position_robot
+        return (pos.X, pos.Y, pos.Z)
+
+    def get_position(self) -> tuple[float, float, float]:
+        return self.state.position()
+
+    def get_telemetry(self) -> dict[str, Any]:
+        # the measured pose, not the commanded one, such that motions can be followed
+        x, y, z = self.read_position()
+        robot_state = self.controller.robot_state
+        motion = self.motions.current
+        return {
+            "pos": [round(x, 1), round(y, 1), round(z, 1)],
+            "din": bitmask(getattr(robot_state, "din", [])),
+            "dout": bitmask(getattr(robot_state, "dout", [])),
+            "gripper": self.state.gripper_closed,
+            "moving": self.state.moving,
+            "motion": None if motion is None else motion.id,
+            "motion_seq": self.state.sequence,
+        }
 
     @property
     def actions(self) -> list[Callable]:
@@ -53,34 +161,120 @@ class RobotActions(object):
             self.release_object,
             self.clearing_position,
             self.capture_image,
+            self.capture_and_detect,
+            self.pick_and_place,
+            self.pick_and_place_many,
+            self.plan_pick_order,
+            self.move_to_async,
+            self.clearing_position_async,
+            self.pick_and_place_async,
+            self.motion_status,
+            self.wait_motion,
+            self.cancel_motion,
         ]
 
     def reset(self) -> None:
         self.controller.set_dout(31, False)
         self.controller.set_dout(30, False)
+        self.state.set_gripper(False)
         self.clearing_position()
 
-    def move_cartesian(self, x: float, y: float, z: float) -> bool:
-        def is_in_box(x, y, box):
-            x1, y1, x2, y2 = box
-            return (x1 <= x <= x2) and (y1 <= y <= y2)
-
-        current_pos = self.get_position()[:2]
-
-        if not (is_in_box(x, y, self.main_workspace) or is_in_box(x, y, self.serving_workspace)):
-            return False
+    def plan_path(
+        self, x: float, y: float, z: float, start: tuple[float, float] | None = None
+    ) -> list[tuple[float, float, float]] | None:
+        """Waypoints from the start (default: current) position to the target, passing the
+        transition point when the target lies in the other workspace. Returns None if the
+        target is outside of both workspaces."""
+        if not self.is_reachable(x, y):
+            return None
 
-        current_space = 0 if is_in_box(*current_pos, self.main_workspace) else 1
+        start = start or self.get_position()[:2]
+        current_space = 0 if is_in_box(*start, self.main_workspace) else 1
         target_space = 0 if is_in_box(x, y, self.main_workspace) else 1
 
+        waypoints = []
         if current_space != target_space:
             # move to transition point
-            pos = (200, 350, z, 180, 0, 180, 0, 0, 0)
-            self.controller.move_cartesian(*pos, velocity=self.velocity, wait_move_finished=True)
+            waypoints.append((*self.transition_point, z))
+        waypoints.append((x, y, z))
+        return waypoints
+
+    def is_reachable(self, x: float, y: float) -> bool:
+        return is_in_box(x, y, self.main_workspace) or is_in_box(x, y, self.serving_workspace)
+
+    def move_path(self, waypoints: list[tuple[float, float, float]]) -> bool:
+        """Moves along the waypoints without stopping at intermediate ones.
+
+        With blending enabled, all but the last segment are queued on the controller without
+        waiting, such that it blends them into one continuous motion. Only the last segment
+        waits for the motion to finish. If blending is disabled or the controller rejects a
+        queued segment, the remaining waypoints are moved to one after another. Fails
+        without moving if any waypoint other than the transition point lies outside of both
+        workspaces.
+        """
+        # the transition point lies between the workspaces
+        if not all(
+            self.is_reachable(x, y) or (x, y) == tuple(self.transition_point)
+            for x, y, _ in waypoints
+        ):
+            return False
 
-        pos = (x, y, z, 180, 0, 180, 0, 0, 0)
-        return self.controller.move_cartesian(*pos, velocity=self.velocity, wait_move_finished=True)
+        # skip the waypoints the arm is already at
+        while len(waypoints) > 0 and self.state.is_at(waypoints[0]):
+            waypoints = waypoints[1:]
+
+        if len(waypoints) == 0:
+            self.state.skipped()
+            return True
+
+        self.state.begin_move(waypoints[-1])
+        try:
+            success = self.execute_path(waypoints)
+        except BaseException:
+            self.state.moved(None)
+            raise
+        if not success:
+            # the arm stopped somewhere along the path
+            self.state.moved(None)
+            return False
 
+        self.state.moved(waypoints[-1])
+        if self.prefetcher is not None and self.state.is_at(self.camera_pose):
+            self.prefetcher.prefetch(self.state.sequence, after=self.state.settled_at)
+        return True
+
+    def execute_path(self, waypoints: list[tuple[float, float, float]]) -> bool:
+        blend = self.blending
+        for i, (x, y, z) in enumerate(waypoints):
+            if self.motions.is_cancelled():
+                return False
+
+            pos = (x, y, z, 180, 0, 180, 0, 0, 0)
+            last = i == len(waypoints) - 1
+
+            if blend and not last:
+                if self.controller.move_cartesian(
+                    *pos, velocity=self.velocity, wait_move_finished=False
+                ):
+                    continue
+                # fall back to sequential moves, the rejected segment is repeated below
+                blend = False
+
+            if not self.controller.move_cartesian(
+                *pos, velocity=self.velocity, wait_move_finished=True
+            ):
+                return False
+
+        return True
+
+    @exclusive
+    def move_cartesian(self, x: float, y: float, z: float) -> bool:
+        waypoints = self.plan_path(x, y, z)
+        if waypoints is None:
+            return False
+        return self.move_path(waypoints)
+
+    @exclusive
     def move_to(self, x: float, y: float) -> bool:
         """
         Commands the robot to move to a specified (x, y) position in world space.
@@ -95,6 +289,7 @@ class RobotActions(object):
         """
         return self.move_cartesian(x, y, self.move_height)
 
+    @exclusive
     def clearing_position(self) -> bool:
         """Moves the robot to a clearing position.
 
@@ -105,8 +300,9 @@ class RobotActions(object):
             bool: True if the robot successfully moved to the clearing position,
             False otherwise.
         """
-        return self.move_cartesian(200, 0, self.move_height)
+        return self.move_cartesian(*self.clearing_point, self.move_height)
 
+    @exclusive
     def grab_object(self) -> bool:
         """Commands the robot to grab the object at it's current position.
 
@@ -117,18 +313,20 @@ class RobotActions(object):
             bool: True if the robot successfully grabbed the object, False otherwise.
         """
 
-        pos = self.get_position()
-
-        if not self.move_cartesian(pos[0], pos[1], 65):
-            return False
+        x, y, _ = self.get_position()
 
-        if not self.controller.set_dout(31, True):
+        if not self.move_path([(x, y, self.grab_height)]):
             return False
 
-        sleep(0.5)
+        grabbed = self.close_gripper()
+        if not grabbed:
+            # do not keep the gripper closed on a missed object
+            self.open_gripper()
 
-        return self.move_cartesian(pos[0], pos[1], self.move_height)
+        # lift in any case, the next move must not start at the height of the table
+        return self.move_path([(x, y, self.move_height)]) and grabbed
 
+    @exclusive
     def release_object(self) -> bool:
         """Commands the robot to release a currently held object.
 
@@ -139,24 +337,377 @@ class RobotActions(object):
             bool: True if the robot successfully released the object, False otherwise.
         """
 
-        pos = self.get_position()
+        x, y, _ = self.get_position()
+
+        if not self.move_path([(x, y, self.release_height)]):
+            return False
+
+        released = self.open_gripper()
+
+        # lift in any case, the next move must not start at the height of the table
+        return self.move_path([(x, y, self.move_height)]) and released
+
+    def close_gripper(self) -> bool:
+        # closing again only repeats the wait, unless the feedback reports a missed object
+        if self.state.gripper_closed and (
+            self.gripper_feedback is None or self.gripper_holds_object()
+        ):
+            self.state.skipped_gripper()
+            return True
 
-        if not self.move_cartesian(pos[0], pos[1], 100):
+        self.state.set_gripper(None)
+        if not self.controller.set_dout(31, True):
             return False
+        self.state.set_gripper(True)
+
+        return self.waits.wait(
+            "grab",
+            self.gripper_holds_object if self.gripper_feedback is not None else None,
+            timeout=self.gripper_timeout,
+            fallback=self.grab_time,
+        )
 
+    def open_gripper(self) -> bool:
+        if self.state.gripper_closed is False:
+            self.state.skipped_gripper()
+            return True
+
+        self.state.set_gripper(None)
         if not self.controller.set_dout(31, False):
             return False
 
         if not self.controller.set_dout(30, True):
             return False
 
-        sleep(1.0)
+        released = self.waits.wait(
+            "release",
+            self.gripper_released if self.gripper_feedback is not None else None,
+            timeout=self.gripper_timeout,
+            fallback=self.release_time,
+        )
 
         if not self.controller.set_dout(30, False):
             return False
 
-        return self.move_cartesian(pos[0], pos[1], self.move_height)
+        self.state.set_gripper(False)
+        return released
+
+    @exclusive
+    def pick_and_place(
+        self,
+        src_xy: tuple[float, float],
+        dst_xy: tuple[float, float],
+        return_to_camera: bool = False,
+    ) -> dict[str, Any]:
+        """Picks up the object at the source position and places it at the destination.
+
+        This is equivalent to moving to the source, grabbing the object, moving to the
+        destination and releasing the object, but runs as a single action with the
+        robot passing through intermediate positions without stopping. It only stops
+        above the source and the destination to descend vertically.
+
+        Args:
+            src_xy (tuple[float, float]): The (x, y) position of the object in world space.
+            dst_xy (tuple[float, float]): The (x, y) position in world space to place
+                the object at.
+            return_to_camera (bool): Whether to move on to the camera pose after placing
+                the object, in the same motion. Use this if an image is captured next.
+
+        Returns:
+            dict: A report with the overall `success`, the total `duration_s` and a list
+            of `steps`, each with its `step` name, `success` and `duration_s`. Steps after
+            a failed step are not executed. If grabbing or releasing fails, the gripper is
+            opened and the arm lifted, which is reported as the `recover` step.
+        """
+        # plan all legs up front such that unreachable targets fail before moving
+        legs = self.plan_pick_and_place(src_xy, dst_xy, return_to_camera=return_to_camera)
+        if legs is None:
+            return {"success": False, "duration_s": 0.0, "steps": [], "error": "unreachable"}
+
+        report = self.run_steps(
+            [
+                ("move_to_source", lambda: self.move_path(legs["move_to_source"])),
+                ("descend", lambda: self.move_path(legs["descend"])),
+                ("grab", self.close_gripper),
+                ("lift", lambda: self.move_path(legs["lift"])),
+                ("move_to_destination", lambda: self.move_path(legs["move_to_destination"])),
+                ("lower", lambda: self.move_path(legs["lower"])),
+                ("release", self.open_gripper),
+                ("retract", lambda: self.move_path(legs["retract"])),
+            ]
+        )
+
+        if not report["success"] and report["steps"][-1]["step"] in ("grab", "release"):
+            # the arm is still at the height of the table, the next action starts from here
+            recovery = self.run_steps([("recover", self.recover_gripper)])
+            report["steps"] += recovery["steps"]
+            report["duration_s"] += recovery["duration_s"]
+
+        return report
+
+    def recover_gripper(self) -> bool:
+        """Opens the gripper and lifts the arm to the move height after a failed grab or
+        release."""
+        opened = self.open_gripper()
+        x, y, _ = self.get_position()
+        return self.move_path([(x, y, self.move_height)]) and opened
+
+    def plan_pick_and_place(
+        self,
+        src_xy: tuple[float, float],
+        dst_xy: tuple[float, float],
+        start: tuple[float, float] | None = None,
+        return_to_camera: bool = False,
+    ) -> dict[str, list[tuple[float, float, float]]] | None:
+        """Paths of a pick and place by step, None if the source or destination is
+        unreachable.
+
+        The moves at the safe height are blended, the vertical moves at the source and the
+        destination are separate moves, such that the gripper never cuts a corner towards
+        an object. The retract lifts after releasing and continues to the camera pose if
+        requested.
+        """
+        (src_x, src_y), (dst_x, dst_y) = src_xy, dst_xy
+        h = self.move_height
+
+        to_src = self.plan_path(src_x, src_y, h, start=start)
+        to_dst = self.plan_path(dst_x, dst_y, h, start=(src_x, src_y))
+        if to_src is None or to_dst is None:
+            return None
+
+        retract = [(dst_x, dst_y, h)]
+        if return_to_camera:
+            # an image is taken right after placing, go there in the same motion
+            to_camera = self.plan_path(*self.camera_pose, start=(dst_x, dst_y))
+            if to_camera is None:
+                return None
+            retract += to_camera
+
+        return {
+            "move_to_source": to_src,
+            "descend": [(src_x, src_y, self.grab_height)],
+            "lift": [(src_x, src_y, h)],
+            "move_to_destination": to_dst,
+            "lower": [(dst_x, dst_y, self.release_height)],
+            "retract": retract,
+        }
+
+    def pick_and_place_cost(
+        self,
+        position: tuple[float, float, float],
+        move: tuple[tuple[float, float], tuple[float, float]],
+    ) -> tuple[float, tuple[float, float, float]]:
+        """Estimated duration of a pick and place starting at the position, and the
+        position it ends at."""
+        legs = self.plan_pick_and_place(*move, start=position[:2])
+        if legs is None:
+            return math.inf, position
+
+        # prefer the measured gripper times over the configured ones
+        waits = self.waits.get_stats()
+        grab = waits["grab"]["mean_s"] if "grab" in waits else self.grab_time
+        release = waits["release"]["mean_s"] if "release" in waits else self.release_time
+
+        model = CostModel(velocity=self.velocity * self.override / 100, blending=self.blending)
+        duration = grab + release
+        for path in legs.values():
+            # every leg starts where the previous one stopped
+            duration += model.path_time([position] + path)
+            position = path[-1]
+        return duration, position
+
+    def plan_pick_order(
+        self, moves: list[tuple[tuple[float, float], tuple[float, float]]]
+    ) -> dict[str, Any]:
+        """Orders multiple pick and place moves such that they finish as fast as possible.
+
+        The order minimizes the estimated travel time of the robot, including detours
+        through the transition point between the workspaces.
+
+        Args:
+            moves (list[tuple[tuple[float, float], tuple[float, float]]]): A list of
+                (src_xy, dst_xy) pairs in world space, see `pick_and_place`.
+
+        Returns:
+            dict: The planned `order` as indices into the given moves, the reordered
+            `moves`, the `estimated_s` duration of executing them in the planned order
+            and `given_order_s` for the given order.
+        """
+        planned = plan_order(moves, self.get_position(), self.pick_and_place_cost)
+        return {
+            "order": planned.order,
+            "moves": [moves[i] for i in planned.order],
+            "estimated_s": planned.estimated_s,
+            "given_order_s": planned.given_order_s,
+        }
+
+    @exclusive
+    def pick_and_place_many(
+        self,
+        moves: list[tuple[tuple[float, float], tuple[float, float]]],
+        optimize_order: bool = False,
+    ) -> dict[str, Any]:
+        """Picks and places multiple objects one after another.
 
+        Args:
+            moves (list[tuple[tuple[float, float], tuple[float, float]]]): A list of
+                (src_xy, dst_xy) pairs in world space, see `pick_and_place`.
+            optimize_order (bool): Whether to execute the moves in the order planned by
+                `plan_pick_order` instead of the given order.
+
+        Returns:
+            dict: A report with the overall `success`, the total `duration_s` and the
+            report of each pick and place in `cycles`. Stops at the first failed cycle.
+        """
+        start = time.perf_counter()
+        if optimize_order:
+            moves = self.plan_pick_order(moves)["moves"]
+
+        cycles = []
+        for src_xy, dst_xy in moves:
+            cycles.append(self.pick_and_place(src_xy, dst_xy))
+            if not cycles[-1]["success"]:
+                break
+
+        return {
+            "success": len(cycles) == len(moves) and all(c["success"] for c in cycles),
+            "duration_s": time.perf_counter() - start,
+            "cycles": cycles,
+        }
+
+    def move_to_async(self, x: float, y: float) -> int:
+        """Starts moving the robot to the (x, y) position in world space and returns
+        immediately, see `move_to`.
+
+        Args:
+            x (float): The x-coordinate of the target position in world space.
+            y (float): The y-coordinate of the target position in world space.
+
+        Returns:
+            int: A handle to query the motion with `motion_status`, `wait_motion` and
+            `cancel_motion`.
+        """
+        return self.submit_motion(
+            "move_to", lambda: self.move_to(x, y), target=(x, y, self.move_height)
+        )
+
+    def clearing_position_async(self) -> int:
+        """Starts moving the robot to the clearing position and returns immediately, see
+        `clearing_position`.
+
+        Returns:
+            int: A handle to query the motion with `motion_status`, `wait_motion` and
+            `cancel_motion`.
+        """
+        return self.submit_motion(
+            "clearing_position",
+            self.clearing_position,
+            target=(*self.clearing_point, self.move_height),
+        )
+
+    def pick_and_place_async(
+        self,
+        src_xy: tuple[float, float],
+        dst_xy: tuple[float, float],
+        return_to_camera: bool = False,
+    ) -> int:
+        """Starts picking up the object at the source position and placing it at the
+        destination and returns immediately, see `pick_and_place`.
+
+        Args:
+            src_xy (tuple[float, float]): The (x, y) position of the object in world space.
+            dst_xy (tuple[float, float]): The (x, y) position in world space to place
+                the object at.
+            return_to_camera (bool): Whether to move on to the camera pose after placing
+                the object.
+
+        Returns:
+            int: A handle to query the motion with `motion_status`, `wait_motion` and
+            `cancel_motion`.
+        """
+        return self.submit_motion(
+            "pick_and_place",
+            lambda: self.pick_and_place(src_xy, dst_xy, return_to_camera),
+            target=self.camera_pose if return_to_camera else (*dst_xy, self.move_height),
+        )
+
+    def submit_motion(
+        self, name: str, fn: Callable[[], Any], target: tuple[float, float, float]
+    ) -> int:
+        # the arm counts as moving from now on, also while the motion waits for earlier ones
+        self.state.begin_move(target)
+        try:
+            motion = self.motions.submit(name, fn)
+        except BaseException:
+            # e.g. submitted after shutdown, the motion never runs
+            self.state.end_move()
+            raise
+        # also called if the motion is cancelled before it started
+        motion.future.add_done_callback(lambda _: self.state.end_move())
+        return motion.id
+
+    def motion_status(self, handle: int) -> dict[str, Any]:
+        """Returns the status of a motion started by one of the async actions.
+
+        Args:
+            handle (int): The handle returned when starting the motion.
+
+        Returns:
+            dict: The motion `handle`, `name` and `status`, which is one of "pending",
+            "running", "done", "failed" or "cancelled". Finished motions also include
+            their `result` and `error`.
+        """
+        return self.motions.get(handle).to_dict()
+
+    def wait_motion(self, handle: int, timeout: float | None = None) -> dict[str, Any]:
+        """Waits until a motion started by one of the async actions finished.
+
+        Args:
+            handle (int): The handle returned when starting the motion.
+            timeout (float | None): Maximum time to wait in seconds, waits indefinitely
+                if None.
+
+        Returns:
+            dict: The motion status after waiting, see `motion_status`.
+        """
+        return self.motions.wait(handle, timeout=timeout).to_dict()
+
+    def cancel_motion(self, handle: int) -> bool:
+        """Cancels a motion started by one of the async actions. A running motion stops
+        the robot at its current position.
+
+        Args:
+            handle (int): The handle returned when starting the motion.
+
+        Returns:
+            bool: True if the motion was cancelled, False if it already finished.
+        """
+        return self.motions.cancel(handle)
+
+    def stop_motion(self) -> None:
+        # abort the motion currently executed by the controller
+        if hasattr(self.controller, "stop_move"):
+            self.controller.stop_move()
+
+    def run_steps(self, steps: list[tuple[str, Callable[[], bool]]]) -> dict[str, Any]:
+        start = time.perf_counter()
+        report = []
+        for name, step in steps:
+            step_start = time.perf_counter()
+            success = bool(step())
+            report.append(
+                {"step": name, "success": success, "duration_s": time.perf_counter() - step_start}
+            )
+            if not success:
+                break
+
+        return {
+            "success": all(r["success"] for r in report),
+            "duration_s": time.perf_counter() - start,
+            "steps": report,
+        }
+
+    @exclusive
     def capture_image(self) -> Image.Image | None:
         """
         Capture an image from the webcam to see your environemt.
@@ -167,49 +718,83 @@ class RobotActions(object):
             or None if the image capture failed.
         """
 
-        self.get_position()
-        if not self.move_cartesian(200, 0, 350):
+        if not self.move_cartesian(*self.camera_pose):
             return False
 
-        sleep(1)
+        if self.prefetcher is not None:
+            image = self.prefetcher.image(self.state.sequence)
+            if image is not None:
+                return image
+
+        # only accept frames that were exposed after the arm came to rest, which may
+        # already be the latest frame if the arm did not need to move
+        return self.take_image(after=self.state.settled_at)
 
-        return self.take_image()
+    @exclusive
+    def capture_and_detect(self) -> tuple[Image.Image, list[BoundingBox]] | None:
+        """Captures an image from the webcam and detects the objects in it.
 
-    def take_image(self) -> Image.Image | None:
-        ret, frame = self.cap.read()
-        if not ret:
+        This is equivalent to calling `capture_image` followed by `detect_objects`, but
+        returns immediately if the robot did not move since the last image.
+
+        Returns:
+            tuple[PIL.Image.Image, list[tuple[float, float, float, float]]] | None: The
+            image and the bounding boxes (x0, y0, x1, y1) of the detected objects in
+            pixel-space, or None if the image capture failed.
+        """
+        if not self.move_cartesian(*self.camera_pose):
             return None
-        # Convert the OpenCV frame (BGR) to RGB format (Pillow expects RGB)
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-        gray = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2GRAY)
+        if self.prefetcher is not None:
+            perception = self.prefetcher.perception(self.state.sequence)
+            if perception is not None:
+                return perception.image, perception.bboxes
 
-        # Calculate grayscale histogram
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+        image = self.take_image(after=self.state.settled_at)
+        if image is None:
+            return None
+        return image, self.detect(image)
+
+    def detect(self, image: Image.Image) -> list[BoundingBox]:
+        if self.detector is None:
+            # the vision stack is only imported when objects are detected on the robot
+            from environment.std_actions.image import ImageActions
+
+            self.detector = ImageActions().detect_objects
+        return self.detector(image)
 
-        # Calculate cumulative distribution
-        accumulator = hist.cumsum()
+    def take_image(self, after: float | None = None) -> Image.Image | None:
+        frame = self.grabber.wait_for_frame(after=after)
+        if frame is None:
+            return None
+        # Frames are already preprocessed by the grabber
+        return Image.fromarray(frame.image)
 
-        # Locate points to clip
-        max_value = accumulator[-1]
-        clip_value = (max_value / 100.0) / 2.0
-        min_gray = np.searchsorted(accumulator, clip_value)
-        max_gray = np.searchsorted(accumulator, max_value - clip_value)
+    def get_motion_stats(self) -> dict[str, int]:
+        return self.state.get_stats()
 
-        # Stretch histogram
-        alpha = 255 / (max_gray - min_gray)
-        beta = -min_gray * alpha
+    def get_prefetch_stats(self) -> dict[str, int]:
+        return self.prefetcher.get_stats() if self.prefetcher is not None else {}
 
-        # Apply new alpha and beta to adjust brightness and contrast
-        adjusted = cv2.convertScaleAbs(frame_rgb, alpha=alpha, beta=beta)
+    def get_wait_stats(self) -> dict[str, dict[str, float]]:
+        return self.waits.get_stats()
 
-        # Convert and return the frame to a PIL image
-        return Image.fromarray(adjusted)
+    def get_camera_timings(self) -> dict[str, dict[str, float]]:
+        return self.preprocessing.get_timings()
 
     def shutdown(self):
+        self.motions.shutdown()
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        self.grabber.stop()
         if self.controller.connected:
             self.controller.disable()
             self.controller.close()
 
     def __del__(self):
         self.shutdown()
+
+
+def is_in_box(x: float, y: float, box: tuple[float, float, float, float]) -> bool:
+    x1, y1, x2, y2 = box
+    return (x1 <= x <= x2) and (y1 <= y <= y2)
@@ -0,0 +1,191 @@
+import logging
+import time
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+from PIL import Image
+
+from robot.actions import RobotActions
+from robot.transform import apply_homogeneous
+
+logger = logging.getLogger(__name__)
+
+
+class MarkerDetector:
+    """ArUco marker detector that is created once and reused for every image."""
+
+    def __init__(self, dictionary: int = cv2.aruco.DICT_4X4_250) -> None:
+        self.detector = cv2.aruco.ArucoDetector(
+            cv2.aruco.getPredefinedDictionary(dictionary), cv2.aruco.DetectorParameters()
+        )
+
+    def detect(self, image: Image.Image | NDArray) -> dict[int, NDArray]:
+        # identify markers and compute center coordinates
+        corners, ids, _ = self.detector.detectMarkers(np.asarray(image))
+        if ids is None:
+            return {}
+        centers = [c[0].mean(axis=0) for c in corners]
+        return dict(zip(ids[:, 0].tolist(), centers, strict=True))
+
+
+@dataclass
+class Observation:
+    # position of the robot when the image was taken
+    position: NDArray
+    # marker id to marker center in pixel space
+    markers: dict[int, NDArray]
+
+
+@dataclass
+class CalibrationResult:
+    homography: NDArray
+    image_resolution: NDArray
+    rmse: float
+    max_error: float
+    n_observations: int
+    n_inliers: int
+    marker_positions: dict[int, NDArray] = field(default_factory=dict)
+
+
+def pose_grid(
+    center: tuple[float, float, float],
+    extent: tuple[float, float] = (100, 100),
+    steps: tuple[int, int] = (3, 3),
+) -> list[tuple[float, float, float]]:
+    """Robot positions on a regular grid of the given extent around the center position."""
+    xs = np.linspace(center[0] - extent[0] / 2, center[0] + extent[0] / 2, steps[0])
+    ys = np.linspace(center[1] - extent[1] / 2, center[1] + extent[1] / 2, steps[1])
+    return [(float(x), float(y), center[2]) for x in xs for y in ys]
+
+
+def collect_observations(
+    robot: RobotActions,
+    poses: list[tuple[float, float, float]],
+    detector: MarkerDetector,
+) -> tuple[list[Observation], list[Image.Image]]:
+    observations, images = [], []
+
+    for pose in poses:
+        if not robot.move_cartesian(*pose):
+            logger.warning(f"Skipping unreachable pose {pose}")
+            continue
+
+        # only use frames that were taken after the arm came to rest
+        image = robot.take_image(after=time.monotonic())
+        if image is None:
+            logger.warning(f"Failed to capture image at pose {pose}")
+            continue
+
+        markers = detector.detect(image)
+        logger.info(f"Detected {len(markers)} markers at pose {pose}")
+
+        observations.append(Observation(np.asarray(robot.get_position()), markers))
+        images.append(image)
+
+    return observations, images
+
+
+def fit_homography(
+    observations: list[Observation],
+    reference: NDArray,
+    image_resolution: NDArray,
+    camera_offset: NDArray = np.zeros(2),
+    ransac_threshold: float = 2.0,
+    iterations: int = 10,
+) -> CalibrationResult:
+    """Fits the homography from pixels of an image taken at the reference position to world
+    coordinates.
+
+    The camera moves parallel to the table with the arm. A marker at the unknown world
+    position X observed at pixel p while the arm is displaced by d from the reference
+    position is seen at the same pixel as the point X - d from the reference position.
+    The homography and the marker positions are estimated alternately. The remaining
+    translational freedom is fixed by mapping the image center to the reference position
+    plus the camera offset.
+    """
+    reference = np.asarray(reference, dtype=np.float64)[:2]
+    center = np.asarray(image_resolution, dtype=np.float64) / 2
+    world_center = reference + np.asarray(camera_offset, dtype=np.float64)
+
+    # flatten all marker observations
+    ids, pixels, displacements = [], [], []
+    for obs in observations:
+        for marker_id, pixel in obs.markers.items():
+            ids.append(marker_id)
+            pixels.append(pixel)
+            displacements.append(obs.position[:2] - reference)
+    ids = np.asarray(ids)
+    pixels = np.asarray(pixels, dtype=np.float64)
+    displacements = np.asarray(displacements, dtype=np.float64)
+    marker_ids = [i for i in np.unique(ids) if (ids == i).sum() >= 2]
+
+    if len(marker_ids) == 0 or len(pixels) < 4:
+        raise ValueError("Not enough marker observations for calibration")
+
+    # initial affine estimate from the relative motion of each marker
+    dp, dd = [], []
+    for i in marker_ids:
+        mask = ids == i
+        dp.append(pixels[mask] - pixels[mask].mean(axis=0))
+        dd.append(displacements[mask] - displacements[mask].mean(axis=0))
+    linear, *_ = np.linalg.lstsq(np.concatenate(dp), -np.concatenate(dd), rcond=None)
+
+    homography = np.eye(3)
+    homography[:2, :2] = linear.T
+    homography[:2, 2] = world_center - linear.T @ center
+
+    keep = np.isin(ids, marker_ids)
+    inliers = keep.copy()
+    for _ in range(iterations):
+        # marker positions implied by the current homography
+        implied = apply_homogeneous(homography, pixels) + displacements
+        positions = marker_positions(implied, ids, inliers)
+
+        valid = inliers & np.isin(ids, list(positions.keys()))
+        targets = np.asarray([positions.get(i, (0.0, 0.0)) for i in ids]) - displacements
+        estimate, _ = cv2.findHomography(
+            pixels[valid], targets[valid], cv2.RANSAC, ransac_threshold
+        )
+        if estimate is None:
+            break
+
+        # fix the translation such that the image center maps to the camera position
+        shift = np.eye(3)
+        shift[:2, 2] = world_center - apply_homogeneous(estimate, center)[0]
+        homography = shift @ estimate
+
+        # outliers may become inliers again as the estimate improves
+        implied = apply_homogeneous(homography, pixels) + displacements
+        positions = marker_positions(implied, ids, inliers)
+        residuals = np.asarray(
+            [
+                np.linalg.norm(x - positions[i]) if i in positions else np.inf
+                for i, x in zip(ids, implied, strict=True)
+            ]
+        )
+        inliers = keep & (residuals < ransac_threshold)
+
+        if inliers.sum() < 4:
+            raise ValueError("Calibration did not converge, too few inliers")
+
+    implied = apply_homogeneous(homography, pixels) + displacements
+    positions = marker_positions(implied, ids, inliers)
+    errors = np.linalg.norm(
+        implied[inliers] - np.asarray([positions[i] for i in ids[inliers]]), axis=1
+    )
+
+    return CalibrationResult(
+        homography=homography,
+        image_resolution=np.asarray(image_resolution),
+        rmse=float(np.sqrt(np.mean(errors**2))),
+        max_error=float(errors.max()),
+        n_observations=int(keep.sum()),
+        n_inliers=int(inliers.sum()),
+        marker_positions=positions,
+    )
+
+
+def marker_positions(implied: NDArray, ids: NDArray, mask: NDArray) -> dict[int, NDArray]:
+    return {int(i): implied[(ids == i) & mask].mean(axis=0) for i in np.unique(ids[mask])}
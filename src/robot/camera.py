@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Callable
+
+import cv2
+import numpy as np
+
+logger = getLogger(__name__)
+
+
+class CameraSource:
+    def read(self) -> tuple[bool, np.ndarray | None]:
+        raise NotImplementedError()
+
+    def release(self) -> None:
+        pass
+
+
+class OpenCVCamera(CameraSource):
+    def __init__(self, device_id: int = 0) -> None:
+        self.device_id = device_id
+        self.cap = cv2.VideoCapture(device_id)
+        if not self.cap.isOpened():
+            raise ConnectionError(f"Could not connect to webcam with device_id={device_id}")
+        # frames are consumed continuously, a deep driver buffer only adds latency
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def read(self) -> tuple[bool, np.ndarray | None]:
+        return self.cap.read()
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class FakeCamera(CameraSource):
+    """Camera source without hardware that replays the given frames at a fixed rate."""
+
+    def __init__(
+        self,
+        frames: list[np.ndarray] | Callable[[], np.ndarray] | None = None,
+        resolution: tuple[int, int] = (1920, 1080),
+        fps: float = 30.0,
+    ) -> None:
+        if frames is None:
+            w, h = resolution
+            frames = [np.full((h, w, 3), 200, dtype=np.uint8)]
+        self.frames = frames
+        self.fps = fps
+        self.index = 0
+        self._next_frame_at = time.monotonic()
+
+    def read(self) -> tuple[bool, np.ndarray | None]:
+        # block until the next frame is due, like a real camera does
+        delay = self._next_frame_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame_at = max(self._next_frame_at, time.monotonic()) + 1.0 / self.fps
+
+        if callable(self.frames):
+            frame = self.frames()
+        else:
+            frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+
+        return True, frame.copy()
+
+
+@dataclass
+class Frame:
+    image: np.ndarray
+    # monotonic time at which the frame was read from the camera
+    timestamp: float
+    index: int
+
+
+class FrameGrabber:
+    """Continuously reads frames from a camera on a background thread.
+
+    Only the newest `buffer_size` frames are kept, such that callers always get a recent
+    frame instead of a stale one from the driver buffer.
+    """
+
+    def __init__(
+        self,
+        source: CameraSource,
+        buffer_size: int = 4,
+        exposure_time: float = 1.0 / 30.0,
+        process: Callable[[np.ndarray], np.ndarray] | None = None,
+    ) -> None:
+        self.source = source
+        # frames are processed on the grabber thread such that they arrive ready to use
+        self.process = process
+        # frames read shortly after a motion finished may still have been exposed during it
+        self.exposure_time = exposure_time
+        self.buffer: deque[Frame] = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: threading.Thread | None = None
+        self._index = 0
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.source.release()
+
+    def _run(self) -> None:
+        while self._running:
+            try:
+                ret, image = self.source.read()
+            except Exception:
+                # keep grabbing, e.g. a camera that was unplugged may come back
+                logger.exception("Failed to read frame from camera")
+                time.sleep(self.exposure_time)
+                continue
+            timestamp = time.monotonic()
+
+            if not ret:
+                logger.warning("Failed to read frame from camera")
+                time.sleep(self.exposure_time)
+                continue
+
+            if self.process is not None:
+                try:
+                    image = self.process(image)
+                except Exception:
+                    logger.exception("Failed to process frame")
+                    continue
+
+            with self._condition:
+                self.buffer.append(Frame(image=image, timestamp=timestamp, index=self._index))
+                self._index += 1
+                self._condition.notify_all()
+
+    def latest(self) -> Frame | None:
+        with self._condition:
+            return self.buffer[-1] if len(self.buffer) > 0 else None
+
+    def wait_for_frame(self, after: float | None = None, timeout: float = 2.0) -> Frame | None:
+        """Returns the newest frame that was exposed completely after the monotonic time `after`.
+
+        Blocks until such a frame is available or the timeout expires, in which case None
+        is returned.
+        """
+        after = time.monotonic() if after is None else after
+
+        def available() -> bool:
+            return len(self.buffer) > 0 and self.buffer[-1].timestamp - self.exposure_time >= after
+
+        with self._condition:
+            if not self._condition.wait_for(available, timeout=timeout):
+                return None
+            return self.buffer[-1]
@@ -0,0 +1,152 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from functools import wraps
+from logging import getLogger
+from typing import Any, Callable, Literal
+
+logger = getLogger(__name__)
+
+MotionStatus = Literal["pending", "running", "done", "failed", "cancelled"]
+
+
+@dataclass
+class Motion:
+    id: int
+    name: str
+    future: Future
+    created: float = field(default_factory=time.monotonic)
+    started: float | None = None
+    finished: float | None = None
+    cancel_requested: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def status(self) -> MotionStatus:
+        if self.future.cancelled() or (self.future.done() and self.cancel_requested.is_set()):
+            return "cancelled"
+        if not self.future.done():
+            return "running" if self.started is not None else "pending"
+        if self.future.exception() is not None:
+            return "failed"
+        # motions report failure either as False or as a report with success set to False
+        result = self.future.result()
+        if result is False or (isinstance(result, dict) and result.get("success") is False):
+            return "failed"
+        return "done"
+
+    def to_dict(self) -> dict[str, Any]:
+        info = {"handle": self.id, "name": self.name, "status": self.status}
+        if self.future.done() and not self.future.cancelled():
+            error = self.future.exception()
+            info["result"] = None if error is not None else self.future.result()
+            info["error"] = None if error is None else repr(error)
+        if self.started is not None:
+            info["duration_s"] = (self.finished or time.monotonic()) - self.started
+        return info
+
+
+class MotionExecutor:
+    """Runs motions one at a time on a background thread and tracks them by handle.
+
+    Every motion holds the given lock while it runs, such that motions started
+    asynchronously never overlap with motions that are executed synchronously under
+    the same lock.
+    """
+
+    def __init__(
+        self,
+        lock: threading.RLock,
+        on_cancel: Callable[[], None] | None = None,
+        max_history: int = 100,
+    ) -> None:
+        self.lock = lock
+        # called when the currently running motion is cancelled, e.g. to stop the arm
+        self.on_cancel = on_cancel
+        self.max_history = max_history
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Motion")
+        self.motions: OrderedDict[int, Motion] = OrderedDict()
+        self.current: Motion | None = None
+        self._ids = itertools.count(1)
+
+    def submit(self, name: str, fn: Callable[[], Any]) -> Motion:
+        motion = Motion(id=next(self._ids), name=name, future=Future())
+
+        def run() -> Any:
+            with self.lock:
+                motion.started = time.monotonic()
+                self.current = motion
+                try:
+                    if motion.cancel_requested.is_set():
+                        return False
+                    return fn()
+                finally:
+                    self.current = None
+                    motion.finished = time.monotonic()
+
+        motion.future = self.executor.submit(run)
+        self.motions[motion.id] = motion
+        self._prune()
+        return motion
+
+    def _prune(self) -> None:
+        # forget the oldest finished motions
+        finished = [i for i, m in self.motions.items() if m.future.done()]
+        for i in finished[: max(0, len(self.motions) - self.max_history)]:
+            del self.motions[i]
+
+    def get(self, handle: int) -> Motion:
+        if handle not in self.motions:
+            raise KeyError(f"Unknown motion handle {handle}")
+        return self.motions[handle]
+
+    def wait(self, handle: int, timeout: float | None = None) -> Motion:
+        motion = self.get(handle)
+        try:
+            motion.future.result(timeout=timeout)
+        except (FutureTimeoutError, CancelledError):
+            pass
+        except Exception:
+            # failures are reported through the motion status
+            logger.exception(f"Motion {motion.name} ({handle}) failed")
+        return motion
+
+    def cancel(self, handle: int) -> bool:
+        motion = self.get(handle)
+        if motion.future.done():
+            return False
+
+        motion.cancel_requested.set()
+        # motions that did not start yet are simply dropped
+        if motion.future.cancel():
+            return True
+
+        if self.current is motion and self.on_cancel is not None:
+            self.on_cancel()
+        return True
+
+    def is_cancelled(self) -> bool:
+        """Whether the motion running on the calling thread was asked to stop."""
+        # only the motion thread can move while a motion runs, as it holds the lock
+        current = self.current
+        return current is not None and current.cancel_requested.is_set()
+
+    def shutdown(self) -> None:
+        for motion in list(self.motions.values()):
+            if not motion.future.done():
+                self.cancel(motion.id)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def exclusive(fn: Callable) -> Callable:
+    """Runs the method under the `motion_lock` of its instance."""
+
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with self.motion_lock:
+            return fn(self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,98 @@
+import math
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+from robot.profile import trapezoid_duration
+
+T = TypeVar("T")
+Point = tuple[float, float, float]
+
+
+@dataclass
+class CostModel:
+    """Estimates motion times with the trapezoidal velocity profiles of the controller."""
+
+    # effective velocity in mm/s, i.e. including the override, and acceleration in mm/s^2
+    velocity: float = 90.0
+    acceleration: float = 1000.0
+    # whether the waypoints of a path are blended or the arm stops at each of them
+    blending: bool = True
+    # time from sending a move until the arm starts moving
+    command_latency: float = 0.01
+
+    def path_time(self, points: list[Point]) -> float:
+        lengths = [math.dist(a, b) for a, b in zip(points[:-1], points[1:], strict=True)]
+        if self.blending:
+            return self.command_latency + trapezoid_duration(
+                sum(lengths), self.velocity, self.acceleration
+            )
+        return sum(
+            self.command_latency + trapezoid_duration(length, self.velocity, self.acceleration)
+            for length in lengths
+        )
+
+
+@dataclass
+class PlannedOrder:
+    order: list[int]
+    estimated_s: float
+    # estimated time when executing the tasks in the given order
+    given_order_s: float
+
+
+def sequence_cost(
+    order: list[int],
+    tasks: list[T],
+    start: Point,
+    task_cost: Callable[[Point, T], tuple[float, Point]],
+) -> float:
+    total, position = 0.0, start
+    for i in order:
+        cost, position = task_cost(position, tasks[i])
+        total += cost
+    return total
+
+
+def plan_order(
+    tasks: list[T],
+    start: Point,
+    task_cost: Callable[[Point, T], tuple[float, Point]],
+    max_rounds: int = 20,
+) -> PlannedOrder:
+    """Orders the tasks to minimize the total cost with a nearest neighbour tour that is
+    improved by 2-opt moves.
+
+    The cost of a task depends on the position the previous task ended at. `task_cost`
+    returns the cost of the task when starting at the given position and the position
+    the task ends at. Since the costs are not symmetric, e.g. only one direction may pass
+    the workspace transition, 2-opt candidates are evaluated on the full sequence.
+    """
+    n = len(tasks)
+
+    # nearest neighbour: always continue with the task that is cheapest to do next
+    order, remaining, position = [], set(range(n)), start
+    while len(remaining) > 0:
+        costs = {i: task_cost(position, tasks[i]) for i in remaining}
+        best = min(remaining, key=lambda i: costs[i][0])
+        order.append(best)
+        remaining.remove(best)
+        position = costs[best][1]
+
+    # 2-opt: reverse subsequences as long as that reduces the total cost
+    best_cost = sequence_cost(order, tasks, start, task_cost)
+    for _ in range(max_rounds):
+        improved = False
+        for i in range(n - 1):
+            for k in range(i + 1, n):
+                candidate = order[:i] + order[i : k + 1][::-1] + order[k + 1 :]
+                cost = sequence_cost(candidate, tasks, start, task_cost)
+                if cost < best_cost - 1e-9:
+                    order, best_cost, improved = candidate, cost, True
+        if not improved:
+            break
+
+    return PlannedOrder(
+        order=order,
+        estimated_s=best_cost,
+        given_order_s=sequence_cost(list(range(n)), tasks, start, task_cost),
+    )
@@ -0,0 +1,117 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Callable
+
+from PIL import Image
+
+logger = getLogger(__name__)
+
+BoundingBox = tuple[float, float, float, float]
+
+
+@dataclass
+class Perception:
+    image: Image.Image
+    bboxes: list[BoundingBox]
+    # motion sequence number the perception is valid for
+    sequence: int
+    detection_ms: float
+
+
+@dataclass
+class PrefetchStats:
+    prefetches: int = 0
+    hits: int = 0
+    misses: int = 0
+    # prefetches that were dropped because the arm moved before they finished
+    discarded: int = 0
+
+
+class PerceptionPrefetcher:
+    """Captures and analyses a frame in the background once the arm comes to rest at
+    the camera pose.
+
+    Results are cached against the motion sequence number, such that they are only
+    returned while the arm did not move since. The image is available as soon as it
+    is captured, before the detection finished.
+    """
+
+    def __init__(
+        self,
+        capture: Callable[[float], Image.Image | None],
+        detect: Callable[[Image.Image], list[BoundingBox]],
+        is_valid: Callable[[int], bool],
+    ) -> None:
+        # captures a frame exposed after the given monotonic time
+        self.capture = capture
+        self.detect = detect
+        # whether a result for the motion sequence number can still be used
+        self.is_valid = is_valid
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Prefetch")
+        self.stats = PrefetchStats()
+        self._lock = threading.Lock()
+        self._sequence: int | None = None
+        self._image: Future = Future()
+        self._result: Future = Future()
+
+    def prefetch(self, sequence: int, after: float) -> None:
+        image, result = Future(), Future()
+        with self._lock:
+            self._sequence, self._image, self._result = sequence, image, result
+            self.stats.prefetches += 1
+
+        def run() -> None:
+            try:
+                captured = self.capture(after)
+                # frames captured while the arm was already moving again are useless
+                if captured is None or not self.is_valid(sequence):
+                    with self._lock:
+                        self.stats.discarded += 1
+                    image.set_result(None)
+                    result.set_result(None)
+                    return
+                image.set_result(captured)
+
+                start = time.perf_counter()
+                bboxes = self.detect(captured)
+                detection_ms = 1000 * (time.perf_counter() - start)
+                result.set_result(Perception(captured, bboxes, sequence, detection_ms))
+            except Exception as e:
+                logger.exception("Failed to prefetch perception")
+                for future in (image, result):
+                    if not future.done():
+                        future.set_exception(e)
+
+        self.executor.submit(run)
+
+    def _get(self, sequence: int, attr: str, timeout: float) -> Image.Image | Perception | None:
+        with self._lock:
+            future = getattr(self, attr) if self._sequence == sequence else None
+        try:
+            value = future.result(timeout=timeout) if future is not None else None
+        except Exception:
+            # failed prefetches are logged when they happen
+            value = None
+
+        with self._lock:
+            if value is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+        return value
+
+    def image(self, sequence: int, timeout: float = 2.0) -> Image.Image | None:
+        return self._get(sequence, "_image", timeout)
+
+    def perception(self, sequence: int, timeout: float = 10.0) -> Perception | None:
+        return self._get(sequence, "_result", timeout)
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(vars(self.stats))
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
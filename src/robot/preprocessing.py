@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+
+class Stage:
+    name: str = "stage"
+
+    def __call__(self, frame: NDArray[np.uint8]) -> NDArray[np.uint8]:
+        raise NotImplementedError()
+
+
+class ColorConvert(Stage):
+    name = "color_convert"
+
+    def __init__(self, code: int = cv2.COLOR_BGR2RGB) -> None:
+        self.code = code
+
+    def __call__(self, frame: NDArray[np.uint8]) -> NDArray[np.uint8]:
+        return cv2.cvtColor(frame, self.code)
+
+
+class Undistort(Stage):
+    """Removes lens distortion using remap tables that are computed once per resolution."""
+
+    name = "undistort"
+
+    def __init__(self, camera_matrix: NDArray, dist_coeffs: NDArray, alpha: float = 0.0) -> None:
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+        self.dist_coeffs = np.asarray(dist_coeffs, dtype=np.float64)
+        # free scaling parameter, 0 crops to valid pixels only and 1 keeps all source pixels
+        self.alpha = alpha
+        self._maps: tuple[NDArray, NDArray] | None = None
+        self._resolution: tuple[int, int] | None = None
+
+    def _build_maps(self, resolution: tuple[int, int]) -> None:
+        new_camera_matrix, _ = cv2.getOptimalNewCameraMatrix(
+            self.camera_matrix, self.dist_coeffs, resolution, self.alpha, resolution
+        )
+        # fixed point maps make remap considerably faster than floating point maps
+        self._maps = cv2.initUndistortRectifyMap(
+            self.camera_matrix,
+            self.dist_coeffs,
+            None,
+            new_camera_matrix,
+            resolution,
+            cv2.CV_16SC2,
+        )
+        self._resolution = resolution
+
+    def __call__(self, frame: NDArray[np.uint8]) -> NDArray[np.uint8]:
+        resolution = (frame.shape[1], frame.shape[0])
+        if self._resolution != resolution:
+            self._build_maps(resolution)
+        return cv2.remap(frame, *self._maps, interpolation=cv2.INTER_LINEAR)
+
+
+class ContrastStretch(Stage):
+    """Stretches the histogram such that `clip_percent` of the pixels saturate.
+
+    The stretch is applied via a 256 entry lookup table. The table is derived from an
+    exponentially averaged histogram of a subsampled grayscale frame, which is cheap to
+    update and keeps the brightness stable between consecutive frames.
+    """
+
+    name = "contrast_stretch"
+
+    def __init__(
+        self,
+        clip_percent: float = 1.0,
+        subsample: int = 4,
+        momentum: float = 0.5,
+        update_every: int = 1,
+    ) -> None:
+        self.clip_percent = clip_percent
+        self.subsample = subsample
+        # weight of the newest histogram, 1.0 only uses the current frame
+        self.momentum = momentum
+        self.update_every = update_every
+        self.hist: NDArray[np.float64] | None = None
+        self.lut = np.arange(256, dtype=np.uint8)
+        self._frames = 0
+
+    def update(self, frame: NDArray[np.uint8]) -> None:
+        small = np.ascontiguousarray(frame[:: self.subsample, :: self.subsample])
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY) if small.ndim == 3 else small
+        hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+        hist /= hist.sum()
+
+        if self.hist is None:
+            self.hist = hist
+        else:
+            self.hist = (1 - self.momentum) * self.hist + self.momentum * hist
+
+        self.lut = stretch_lut(self.hist, self.clip_percent)
+
+    def __call__(self, frame: NDArray[np.uint8]) -> NDArray[np.uint8]:
+        if self._frames % self.update_every == 0:
+            self.update(frame)
+        self._frames += 1
+        return cv2.LUT(frame, self.lut)
+
+
+def stretch_lut(hist: NDArray, clip_percent: float = 1.0) -> NDArray[np.uint8]:
+    # Calculate cumulative distribution
+    accumulator = np.cumsum(hist)
+
+    # Locate points to clip
+    max_value = accumulator[-1]
+    clip_value = (max_value * clip_percent / 100.0) / 2.0
+    min_gray = np.searchsorted(accumulator, clip_value)
+    max_gray = np.searchsorted(accumulator, max_value - clip_value)
+
+    if max_gray <= min_gray:
+        return np.arange(256, dtype=np.uint8)
+
+    # Stretch histogram, the table matches the result of cv2.convertScaleAbs
+    alpha = 255 / (max_gray - min_gray)
+    beta = -min_gray * alpha
+    return np.clip(np.abs(np.arange(256) * alpha + beta).round(), 0, 255).astype(np.uint8)
+
+
+@dataclass
+class StageTiming:
+    count: int = 0
+    last_ms: float = 0.0
+    total_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count > 0 else 0.0
+
+
+class PreprocessingPipeline:
+    def __init__(self, stages: list[Stage]) -> None:
+        self.stages = stages
+        self.timings = {stage.name: StageTiming() for stage in stages}
+
+    def __call__(self, frame: NDArray[np.uint8]) -> NDArray[np.uint8]:
+        for stage in self.stages:
+            start = time.perf_counter()
+            frame = stage(frame)
+            elapsed = 1000 * (time.perf_counter() - start)
+
+            timing = self.timings[stage.name]
+            timing.count += 1
+            timing.last_ms = elapsed
+            timing.total_ms += elapsed
+
+        return frame
+
+    def get_timings(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {"count": t.count, "last_ms": t.last_ms, "mean_ms": t.mean_ms}
+            for name, t in self.timings.items()
+        }
+
+    @staticmethod
+    def from_config(config: dict) -> PreprocessingPipeline:
+        stages: list[Stage] = [ColorConvert(cv2.COLOR_BGR2RGB)]
+        if "undistort" in config:
+            stages.append(Undistort(**config["undistort"]))
+        if config.get("contrast", {}) is not None:
+            stages.append(ContrastStretch(**config.get("contrast", {})))
+        return PreprocessingPipeline(stages)
+
+    @staticmethod
+    def load(file_path: str) -> PreprocessingPipeline:
+        with open(file_path, "r") as f:
+            return PreprocessingPipeline.from_config(json.loads(f.read()))
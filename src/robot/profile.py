@@ -0,0 +1,28 @@
+import math
+
+
+def trapezoid_duration(length: float, velocity: float, acceleration: float) -> float:
+    """Duration of a motion over the length that accelerates to the velocity and
+    decelerates to a stop at the same rate."""
+    if length <= 0:
+        return 0.0
+    ramp = velocity**2 / acceleration
+    if ramp >= length:
+        # triangular profile, the motion never reaches the velocity
+        return 2 * math.sqrt(length / acceleration)
+    return 2 * velocity / acceleration + (length - ramp) / velocity
+
+
+def trapezoid_distance(t: float, length: float, velocity: float, acceleration: float) -> float:
+    """Distance travelled after time t on the trapezoidal profile of `trapezoid_duration`."""
+    duration = trapezoid_duration(length, velocity, acceleration)
+    if t >= duration:
+        return length
+    # peak velocity, lower than the velocity for triangular profiles
+    peak = min(velocity, math.sqrt(length * acceleration))
+    t_ramp = peak / acceleration
+    if t < t_ramp:
+        return 0.5 * acceleration * t**2
+    if t < duration - t_ramp:
+        return 0.5 * peak * t_ramp + peak * (t - t_ramp)
+    return length - 0.5 * acceleration * (duration - t) ** 2
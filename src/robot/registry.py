@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import inspect
+import json
+import os
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable
+
+from robot.actions import RobotActions
+from robot.camera import FakeCamera
+from robot.preprocessing import PreprocessingPipeline
+from robot.sim import SceneRenderer, SimObject, SimulatedCRIController
+from robot.transform import WorldTransform
+
+# RobotActions arguments that can be set per robot in the config
+ROBOT_ATTRIBUTES = [
+    "main_workspace",
+    "serving_workspace",
+    "transition_point",
+    "camera_pose",
+    "clearing_point",
+]
+
+
+@dataclass
+class Robot:
+    name: str
+    actions: RobotActions
+    transform: WorldTransform
+    callables: dict[str, Callable] = field(init=False)
+
+    def __post_init__(self) -> None:
+        transform_actions = [
+            self.transform.transform_pixel_to_world_coords,
+            self.transform.transform_world_to_pixel_coords,
+            self.transform.pixels_to_world,
+            self.transform.world_to_pixels,
+        ]
+        self.callables = {fn.__name__: fn for fn in self.actions.actions + transform_actions}
+
+
+class RobotRegistry:
+    """Robots hosted by a single environment, addressed by name.
+
+    Each robot has its own controller, camera and world transform. Actions are exposed
+    once for all robots with an additional `robot` argument that selects the robot to
+    run on. Motions of each robot are serialized by the motion lock of its
+    `RobotActions`, while different robots run in parallel.
+    """
+
+    def __init__(self) -> None:
+        self.robots: dict[str, Robot] = {}
+        self.default: str | None = None
+
+    def add(self, name: str, actions: RobotActions, transform: WorldTransform) -> None:
+        if name in self.robots:
+            raise ValueError(f"Robot '{name}' already registered")
+        self.robots[name] = Robot(name, actions, transform)
+        self.default = self.default or name
+
+    def get(self, name: str | None = None) -> Robot:
+        name = name or self.default
+        if name not in self.robots:
+            raise KeyError(f"Unknown robot '{name}', available are {list(self.robots)}")
+        return self.robots[name]
+
+    def route(self, name: str) -> Callable:
+        """Action that calls the action with the given name on the robot passed as the
+        `robot` keyword argument."""
+        template = self.get().callables[name]
+
+        @wraps(template)
+        def action(*args, robot: str | None = None, **kwargs) -> Any:
+            return self.get(robot).callables[name](*args, **kwargs)
+
+        # extend the signature and documentation of the action by the robot argument
+        signature = inspect.signature(template)
+        robot_param = inspect.Parameter(
+            "robot", inspect.Parameter.KEYWORD_ONLY, default=self.default, annotation=str
+        )
+        action.__signature__ = signature.replace(
+            parameters=[*signature.parameters.values(), robot_param]
+        )
+        action.__doc__ = (
+            f"{inspect.cleandoc(template.__doc__ or '')}\n\n"
+            f"Runs on the robot given by the `robot` keyword argument, one of "
+            f"{', '.join(repr(n) for n in self.robots)} (default: {self.default!r})."
+        )
+        return action
+
+    @property
+    def actions(self) -> list[Callable]:
+        return [self.route(name) for name in self.get().callables]
+
+    def shutdown(self) -> None:
+        for robot in self.robots.values():
+            robot.actions.shutdown()
+
+    @staticmethod
+    def from_config(config: dict) -> RobotRegistry:
+        registry = RobotRegistry()
+        for name, robot_config in config["robots"].items():
+            actions, transform = build_robot(robot_config)
+            registry.add(name, actions, transform)
+
+        registry.default = config.get("default", registry.default)
+        return registry
+
+    @staticmethod
+    def load(file_path: str) -> RobotRegistry:
+        with open(file_path, "r") as f:
+            return RobotRegistry.from_config(json.loads(f.read()))
+
+
+def build_robot(config: dict) -> tuple[RobotActions, WorldTransform]:
+    transform = WorldTransform.load(config.get("world_state", "data/world_state.json"))
+
+    preprocessing = None
+    if "camera" in config and os.path.exists(config["camera"]):
+        preprocessing = PreprocessingPipeline.load(config["camera"])
+
+    kwargs = {
+        "preprocessing": preprocessing,
+        "gripper_feedback": config.get("gripper_feedback"),
+        "prefetch": config.get("prefetch", False),
+        "blending": config.get("blending", False),
+    }
+
+    if config.get("simulated", False):
+        # simulated controller with a camera rendering the simulated objects
+        objects = [SimObject(*obj) for obj in config.get("objects", [])]
+        controller = SimulatedCRIController(objects=objects)
+        kwargs["gripper_feedback"] = controller.gripper_feedback
+        kwargs["controller"] = controller
+        kwargs["camera"] = FakeCamera(SceneRenderer(controller, transform))
+    else:
+        kwargs["ip"] = config["ip"]
+        kwargs["device_id"] = config.get("device_id", 0)
+
+    # passed to the constructor, which already moves the arm to the clearing position
+    for attr in ROBOT_ATTRIBUTES:
+        if attr in config:
+            kwargs[attr] = tuple(config[attr])
+
+    return RobotActions(**kwargs), transform
@@ -0,0 +1,300 @@
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+from robot.profile import trapezoid_distance, trapezoid_duration
+from robot.transform import WorldTransform
+
+
+class KinematicsState(Enum):
+    NO_ERROR = 0
+    MOTION_NOT_ALLOWED = 1
+
+
+@dataclass
+class Position:
+    X: float
+    Y: float
+    Z: float
+    A: float = 180.0
+    B: float = 0.0
+    C: float = 180.0
+
+
+@dataclass
+class SimObject:
+    # center position and radius in world space (mm)
+    x: float
+    y: float
+    radius: float = 20.0
+    # color in BGR, like the frames of a real camera
+    color: tuple[int, int, int] = (60, 60, 160)
+
+
+@dataclass
+class Path:
+    """Polyline that is travelled with a single trapezoidal profile, i.e. blended through
+    all intermediate points."""
+
+    points: list[NDArray]
+    start: float
+    velocity: float
+    acceleration: float
+    lengths: NDArray = field(init=False)
+    duration: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.update()
+
+    def update(self) -> None:
+        segments = [
+            np.linalg.norm(b - a) for a, b in zip(self.points[:-1], self.points[1:], strict=True)
+        ]
+        self.lengths = np.concatenate(([0.0], np.cumsum(segments)))
+        self.duration = trapezoid_duration(self.lengths[-1], self.velocity, self.acceleration)
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+    def decelerating(self, now: float) -> bool:
+        peak = min(self.velocity, math.sqrt(self.lengths[-1] * self.acceleration))
+        return now >= self.end - peak / self.acceleration
+
+    def position(self, now: float) -> NDArray:
+        distance = trapezoid_distance(
+            now - self.start, self.lengths[-1], self.velocity, self.acceleration
+        )
+        i = int(np.clip(np.searchsorted(self.lengths, distance) - 1, 0, len(self.points) - 2))
+        segment = self.lengths[i + 1] - self.lengths[i]
+        alpha = 0.0 if segment == 0 else (distance - self.lengths[i]) / segment
+        return self.points[i] + min(alpha, 1.0) * (self.points[i + 1] - self.points[i])
+
+
+class SimulatedRobotState:
+    def __init__(self, controller: "SimulatedCRIController") -> None:
+        self.controller = controller
+        self.din = [False] * 64
+        self.dout = [False] * 64
+
+    @property
+    def kinematics_state(self) -> KinematicsState:
+        if self.controller.kinematics_ready():
+            return KinematicsState.NO_ERROR
+        return KinematicsState.MOTION_NOT_ALLOWED
+
+    @property
+    def position_robot(self) -> Position:
+        return Position(*self.controller.position())
+
+
+class SimulatedCRIController:
+    """Stand-in for `cri_lib.CRIController` with the subset used by `RobotActions`.
+
+    Moves follow trapezoidal velocity profiles in real time. Moves that are queued
+    without waiting are blended with the following moves into a single profile, unless
+    the arm already decelerates towards the end of the queued move. The gripper on
+    digital output 31 picks up the closest object below it and reports on the feedback
+    input whether it holds one.
+    """
+
+    def __init__(
+        self,
+        objects: list[SimObject] | None = None,
+        home: tuple[float, float, float] = (200.0, 0.0, 150.0),
+        acceleration: float = 1000.0,
+        command_latency: float = 0.01,
+        enable_time: float = 0.5,
+        gripper_time: float = 0.2,
+        gripper_feedback: int = 0,
+        grab_height: float = 80.0,
+    ) -> None:
+        self.objects = objects if objects is not None else []
+        self.held: SimObject | None = None
+        # mm/s^2, the velocity of each move is given as an argument in mm/s
+        self.acceleration = acceleration
+        # time from sending a command until the arm starts moving
+        self.command_latency = command_latency
+        self.enable_time = enable_time
+        self.gripper_time = gripper_time
+        self.gripper_feedback = gripper_feedback
+        # the gripper only reaches objects when it is lowered below this height
+        self.grab_height = grab_height
+        self.override = 100.0
+        self.connected = False
+        self.robot_state = SimulatedRobotState(self)
+
+        self._rest = np.asarray(home, dtype=np.float64)
+        self._paths: deque[Path] = deque()
+        self._blend = False
+        self._ready_at = math.inf
+        self._condition = threading.Condition()
+        self._stops = 0
+
+    def connect(self, ip: str = "", port: int = 3920) -> bool:
+        self.connected = True
+        return True
+
+    def close(self) -> None:
+        self.connected = False
+
+    def set_active_control(self, active: bool) -> None:
+        pass
+
+    def enable(self) -> bool:
+        self._ready_at = time.monotonic() + self.enable_time
+        return True
+
+    def disable(self) -> bool:
+        self._ready_at = math.inf
+        return True
+
+    def kinematics_ready(self) -> bool:
+        return time.monotonic() >= self._ready_at
+
+    def wait_for_kinematics_ready(self, timeout: float = 30) -> bool:
+        deadline = time.monotonic() + timeout
+        while not self.kinematics_ready():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(0.01, max(0.0, self._ready_at - time.monotonic())))
+        return True
+
+    def set_override(self, override: float) -> None:
+        self.override = override
+
+    def position(self) -> NDArray:
+        with self._condition:
+            now = time.monotonic()
+            # retire finished paths
+            while len(self._paths) > 0 and now >= self._paths[0].end:
+                self._rest = self._paths.popleft().points[-1]
+            if len(self._paths) > 0:
+                return self._paths[0].position(now)
+            return self._rest.copy()
+
+    def move_cartesian(
+        self,
+        *pose: float,
+        velocity: float = 100.0,
+        wait_move_finished: bool = False,
+        move_finished_timeout: float | None = 300.0,
+    ) -> bool:
+        if not (self.connected and self.kinematics_ready()):
+            return False
+
+        # the pose is (X, Y, Z, A, B, C, E1, E2, E3), orientation and external axes are ignored
+        target = np.asarray(pose[:3], dtype=np.float64)
+        velocity = velocity * self.override / 100.0
+
+        self.position()
+        with self._condition:
+            now = time.monotonic()
+            last = self._paths[-1] if len(self._paths) > 0 else None
+
+            if last is not None and self._blend and not last.decelerating(now):
+                # extend the running profile instead of stopping at its end
+                last.points.append(target)
+                last.velocity = min(last.velocity, velocity)
+                last.update()
+            else:
+                start = self._rest if last is None else last.points[-1]
+                begin = max(now, last.end if last is not None else now) + self.command_latency
+                self._paths.append(Path([start, target], begin, velocity, self.acceleration))
+
+            self._blend = not wait_move_finished
+            end, stops = self._paths[-1].end, self._stops
+
+        if not wait_move_finished:
+            return True
+
+        with self._condition:
+            # wake up early if the motion is stopped
+            self._condition.wait_for(
+                lambda: self._stops != stops, timeout=max(0.0, end - time.monotonic())
+            )
+            return self._stops == stops
+
+    def stop_move(self) -> bool:
+        position = self.position()
+        with self._condition:
+            # stop where the arm currently is
+            self._paths.clear()
+            self._rest = position
+            self._blend = False
+            self._stops += 1
+            self._condition.notify_all()
+        return True
+
+    def set_dout(self, index: int, value: bool) -> bool:
+        self.robot_state.dout[index] = value
+        if index == 31:
+            threading.Timer(self.gripper_time, self._actuate_gripper, args=(value,)).start()
+        return True
+
+    def _actuate_gripper(self, close: bool) -> None:
+        x, y, z = self.position()
+        if close and self.held is None and z <= self.grab_height:
+            # pick up the closest object under the gripper
+            reachable = [o for o in self.objects if math.hypot(o.x - x, o.y - y) <= o.radius]
+            if len(reachable) > 0:
+                self.held = min(reachable, key=lambda o: math.hypot(o.x - x, o.y - y))
+        elif not close and self.held is not None:
+            # drop the object where the gripper currently is
+            self.held.x, self.held.y = float(x), float(y)
+            self.held = None
+
+        self.robot_state.din[self.gripper_feedback] = self.held is not None
+
+    def object_positions(self) -> list[tuple[SimObject, float, float]]:
+        x, y, _ = self.position()
+        return [(o, float(x), float(y)) if o is self.held else (o, o.x, o.y) for o in self.objects]
+
+
+class SceneRenderer:
+    """Renders the objects of the simulated controller as seen by the camera on the arm.
+
+    The transform maps pixels to world coordinates for images taken at the reference
+    position. As the camera moves with the arm, objects are shifted by the displacement
+    of the arm from the reference position. Changes in height are not modelled.
+    """
+
+    def __init__(
+        self,
+        controller: SimulatedCRIController,
+        transform: WorldTransform,
+        reference: tuple[float, float] = (200.0, 0.0),
+        background: int = 200,
+    ) -> None:
+        self.controller = controller
+        self.transform = transform
+        self.reference = np.asarray(reference, dtype=np.float64)
+        w, h = (int(v) for v in transform.resolution)
+        self.background = np.full((h, w, 3), background, dtype=np.uint8)
+
+    def __call__(self) -> NDArray[np.uint8]:
+        frame = self.background.copy()
+        displacement = self.controller.position()[:2] - self.reference
+
+        objects = self.controller.object_positions()
+        if len(objects) == 0:
+            return frame
+
+        centers = np.asarray([(x, y) for _, x, y in objects]) - displacement
+        edges = centers + np.asarray([(o.radius, 0.0) for o, _, _ in objects])
+        pixels = self.transform.world_to_pixels(np.concatenate((centers, edges)))
+
+        for (o, _, _), center, edge in zip(
+            objects, pixels[: len(objects)], pixels[len(objects) :], strict=True
+        ):
+            radius = max(1, round(math.dist(center, edge)))
+            cv2.circle(frame, (round(center[0]), round(center[1])), radius, o.color, -1)
+
+        return frame
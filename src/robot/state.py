@@ -0,0 +1,112 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+Pose = tuple[float, float, float]
+
+
+@dataclass
+class MotionStats:
+    executed_moves: int = 0
+    skipped_moves: int = 0
+    position_reads: int = 0
+    cached_reads: int = 0
+    gripper_commands: int = 0
+    skipped_gripper_commands: int = 0
+
+
+class MotionState:
+    """Tracks the pose and gripper state of the arm.
+
+    Position reads go to the live position reported by the controller. Only if it cannot
+    be read, the last commanded pose is returned instead, i.e. the target of the running
+    motion or the pose the last successful move ended at. Moves are counted as running
+    from the moment they are issued, including motions queued to run asynchronously.
+    """
+
+    def __init__(self, read_position: Callable[[], Pose], tolerance: float = 0.5) -> None:
+        self.read_position = read_position
+        # distance in mm below which a move is considered a no-op
+        self.tolerance = tolerance
+        self.pose: Pose | None = None
+        # pose the running motion moves to, if known
+        self.target: Pose | None = None
+        self.gripper_closed: bool | None = None
+        # incremented with every executed move, i.e. whenever the scene may have changed
+        self.sequence = 0
+        # number of issued moves that did not finish yet
+        self.running = 0
+        # monotonic time at which the last executed move finished
+        self.settled_at = time.monotonic()
+        self.stats = MotionStats()
+        self._lock = threading.Lock()
+
+    @property
+    def moving(self) -> bool:
+        return self.running > 0
+
+    def position(self) -> Pose:
+        try:
+            live = self.read_position()
+        except Exception:
+            with self._lock:
+                fallback = self.target if self.moving and self.target is not None else self.pose
+                if fallback is None:
+                    raise
+                self.stats.cached_reads += 1
+                return fallback
+
+        with self._lock:
+            self.stats.position_reads += 1
+            return live
+
+    def is_at(self, pose: Pose) -> bool:
+        return math.dist(self.position(), pose) <= self.tolerance
+
+    def begin_move(self, target: Pose | None = None) -> None:
+        """Records an issued move, finished by `moved` or `end_move`."""
+        with self._lock:
+            self.running += 1
+            self.target = target or self.target
+
+    def end_move(self) -> None:
+        """Records the end of an issued move without changing the pose, e.g. of an
+        asynchronous motion whose moves were recorded on their own."""
+        with self._lock:
+            self.running = max(0, self.running - 1)
+            if self.running == 0:
+                self.target = None
+
+    def moved(self, pose: Pose | None) -> None:
+        """Records an executed move that ended at the pose, or at an unknown pose if None."""
+        with self._lock:
+            self.pose = pose
+            self.settled_at = time.monotonic()
+            self.sequence += 1
+            self.stats.executed_moves += 1
+        self.end_move()
+
+    def is_settled(self, sequence: int) -> bool:
+        """Whether the arm did not move since the move with the sequence number finished."""
+        with self._lock:
+            return self.sequence == sequence and not self.moving
+
+    def skipped(self) -> None:
+        with self._lock:
+            self.stats.skipped_moves += 1
+
+    def set_gripper(self, closed: bool | None) -> None:
+        """Records a finished gripper command, or one in progress if None."""
+        with self._lock:
+            self.gripper_closed = closed
+            self.stats.gripper_commands += int(closed is not None)
+
+    def skipped_gripper(self) -> None:
+        with self._lock:
+            self.stats.skipped_gripper_commands += 1
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**vars(self.stats), "sequence": self.sequence}
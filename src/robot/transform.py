@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 
 import numpy as np
-from numpy.typing import NDArray
+from numpy.typing import ArrayLike, NDArray
 
 
 class WorldTransform:
@@ -26,6 +26,15 @@ class WorldTransform:
         self.image_transform = np.column_stack((image_v1, image_v2))
         self.world_transform = np.column_stack((world_v1, world_v2))
 
+        # The mapping is affine, world = world_anchor + M @ (resolution / 2 - pixel) with
+        # M = world_transform @ image_transform^-1. Precompute it as a homogeneous matrix
+        # such that converting points is a single matrix product.
+        m = self.world_transform @ np.linalg.pinv(self.image_transform)
+        self.matrix = np.eye(3)
+        self.matrix[:2, :2] = -m
+        self.matrix[:2, 2] = self.world_anchor + m @ (self.resolution / 2)
+        self.inverse = np.linalg.inv(self.matrix)
+
     def save(self, file_path: str) -> None:
         state = {
             "image_resolution": self.resolution.tolist(),
@@ -43,6 +52,9 @@ class WorldTransform:
         with open(file_path, "r") as f:
             state = json.loads(f.read())
 
+        if state.get("type") == HomographyTransform.TYPE:
+            return HomographyTransform.from_state(state)
+
         return WorldTransform(
             image_resolution=np.asarray(state["image_resolution"]),
             image_anchor=np.asarray(state["image_anchor"]),
@@ -62,20 +74,88 @@ class WorldTransform:
         Returns:
             tuple[float, float]: The corresponding point (x, y) in world space.
         """
+        (wx, wy), *_ = apply_homogeneous(self.matrix, [(x, y)])
+        return float(wx), float(wy)
+
+    def transform_world_to_pixel_coords(self, x: float, y: float) -> tuple[float, float]:
+        """Transform world coordinates to pixel coordinates.
+
+        Args:
+            x (float): The x-coordinate in world space.
+            y (float): The y-coordinate in world space.
+        Returns:
+            tuple[float, float]: The corresponding point (x, y) in pixel space.
+        """
+        (px, py), *_ = apply_homogeneous(self.inverse, [(x, y)])
+        return float(px), float(py)
+
+    def pixels_to_world(self, points: list[tuple[float, float]]) -> list[tuple[float, float]]:
+        """Transform many pixel coordinates to world coordinates at once.
+
+        Prefer this function over calling `transform_pixel_to_world_coords` in a loop,
+        e.g. to convert the centers of all detected objects of an image.
 
-        # transform pixel coordinate relative to camera center
-        target = np.asarray([x, y])
-        target = self.resolution / 2 + (self.image_anchor - target)
+        Args:
+            points (list[tuple[float, float]]): The points (x, y) in pixel space.
+        Returns:
+            list[tuple[float, float]]: The corresponding points (x, y) in world space.
+        """
+        return [tuple(p) for p in apply_homogeneous(self.matrix, points).tolist()]
+
+    def world_to_pixels(self, points: list[tuple[float, float]]) -> list[tuple[float, float]]:
+        """Transform many world coordinates to pixel coordinates at once.
+
+        Args:
+            points (list[tuple[float, float]]): The points (x, y) in world space.
+        Returns:
+            list[tuple[float, float]]: The corresponding points (x, y) in pixel space.
+        """
+        return [tuple(p) for p in apply_homogeneous(self.inverse, points).tolist()]
 
-        v = target - self.image_anchor
 
-        coefficients, _, _, _ = np.linalg.lstsq(self.image_transform, v, rcond=None)
-        alpha, beta = coefficients
+class HomographyTransform(WorldTransform):
+    """World transform given by a full homography, e.g. fitted by `robot.calibration`."""
 
-        target_world = (
-            alpha * self.world_transform[:, 0]
-            + beta * self.world_transform[:, 1]
-            + self.world_anchor
+    TYPE = "homography"
+    VERSION = 1
+
+    def __init__(
+        self, image_resolution: NDArray, homography: NDArray, metadata: dict | None = None
+    ) -> None:
+        self.resolution = np.asarray(image_resolution)
+        self.matrix = np.asarray(homography, dtype=np.float64)
+        self.inverse = np.linalg.inv(self.matrix)
+        # calibration details like the residual error, stored alongside the model
+        self.metadata = metadata or {}
+
+    def save(self, file_path: str) -> None:
+        state = {
+            "type": self.TYPE,
+            "version": self.VERSION,
+            "image_resolution": self.resolution.tolist(),
+            "homography": self.matrix.tolist(),
+            "metadata": self.metadata,
+        }
+
+        with open(file_path, "w+") as fp:
+            fp.write(json.dumps(state, indent=2))
+
+    @staticmethod
+    def from_state(state: dict) -> HomographyTransform:
+        if state["version"] > HomographyTransform.VERSION:
+            raise ValueError(f"Unsupported homography transform version {state['version']}")
+
+        return HomographyTransform(
+            image_resolution=np.asarray(state["image_resolution"]),
+            homography=np.asarray(state["homography"]),
+            metadata=state.get("metadata"),
         )
 
-        return target_world[0], target_world[1]
+
+def apply_homogeneous(matrix: NDArray, points: ArrayLike) -> NDArray:
+    """Applies a 3x3 homogeneous transform to an array of points of shape (N, 2)."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    transformed = points @ matrix[:2, :2].T + matrix[:2, 2]
+    # perspective division, a no-op for affine transforms
+    w = points @ matrix[2, :2] + matrix[2, 2]
+    return transformed / w[:, None]
@@ -0,0 +1,87 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass
+class WaitStats:
+    count: int = 0
+    timeouts: int = 0
+    # waits without a condition to wait for that slept the full fallback time
+    fallbacks: int = 0
+    last_s: float = 0.0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    # time saved compared to sleeping the fixed fallback time on every wait
+    saved_s: float = 0.0
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.count if self.count > 0 else 0.0
+
+
+def wait_until(predicate: Callable[[], bool], timeout: float, poll: float = 0.005) -> bool:
+    """Blocks until the predicate holds. Returns False if the timeout expired before."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(poll, remaining))
+    return True
+
+
+class WaitRecorder:
+    """Waits on conditions and records how long each named wait actually took."""
+
+    def __init__(self) -> None:
+        self.stats: dict[str, WaitStats] = {}
+        self._lock = threading.Lock()
+
+    def wait(
+        self,
+        name: str,
+        predicate: Callable[[], bool] | None,
+        timeout: float,
+        fallback: float,
+    ) -> bool:
+        """Waits until the predicate holds or the timeout expires.
+
+        Without a predicate, e.g. when the hardware provides no feedback, this sleeps
+        for the fixed fallback time instead and always succeeds.
+        """
+        start = time.monotonic()
+        if predicate is None:
+            time.sleep(fallback)
+            success = True
+        else:
+            success = wait_until(predicate, timeout)
+        elapsed = time.monotonic() - start
+
+        with self._lock:
+            stats = self.stats.setdefault(name, WaitStats())
+            stats.count += 1
+            stats.timeouts += int(not success)
+            stats.fallbacks += int(predicate is None)
+            stats.last_s = elapsed
+            stats.total_s += elapsed
+            stats.max_s = max(stats.max_s, elapsed)
+            stats.saved_s += fallback - elapsed
+
+        return success
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                name: {
+                    "count": s.count,
+                    "timeouts": s.timeouts,
+                    "fallbacks": s.fallbacks,
+                    "last_s": s.last_s,
+                    "mean_s": s.mean_s,
+                    "max_s": s.max_s,
+                    "saved_s": s.saved_s,
+                }
+                for name, s in self.stats.items()
+            }
@@ -0,0 +1,20 @@
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+
+def run_metadata() -> dict:
+    """Describes the run of a benchmark, stored with its results to compare runs."""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
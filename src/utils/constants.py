@@ -6,3 +6,15 @@ STD_ENV_HOST_ADRESS = os.getenv("STD_ENV_HOST_ADRESS", "localhost")
 STD_ENV_PORT = int(os.getenv("STD_ENV_PORT", "8001"))
 ENV_HOST_ADRESS = os.getenv("ENV_HOST_ADRESS", "localhost")
 ENV_PORT = int(os.getenv("ENV_PORT", "8002"))
+VLM_CACHE_PATH = os.getenv("VLM_CACHE_PATH", ".cache/vlm_responses.sqlite")
+VLM_CACHE_MAX_BYTES = int(os.getenv("VLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+VLM_CACHE_TTL = float(os.getenv("VLM_CACHE_TTL", str(7 * 24 * 60 * 60)))
+ROBOT_PREFETCH = os.getenv("ROBOT_PREFETCH", "0") == "1"
+ROBOT_BLENDING = os.getenv("ROBOT_BLENDING", "0") == "1"
+TELEMETRY_RATE = float(os.getenv("TELEMETRY_RATE", "30"))
+TRACE_PATH = os.getenv("TRACE_PATH")
+AGENT_SESSION = os.getenv("AGENT_SESSION")
+AGENT_MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "8"))
+AGENT_KERNELS = int(os.getenv("AGENT_KERNELS", "2" if AGENT_MAX_SESSIONS > 1 else "0"))
+AGENT_SESSION_TIMEOUT = float(os.getenv("AGENT_SESSION_TIMEOUT", str(30 * 60)))
+AGENT_MAX_MEMORY_BYTES = int(os.getenv("AGENT_MAX_MEMORY_BYTES", "0"))
@@ -15,12 +15,16 @@ async def connect_and_receive_messages(
     host: str = "localhost",
     port: int = 8000,
     callbacks: list[AgentCallback] = [],
+    session_id: str | None = None,
 ) -> T:
     client = httpx.AsyncClient(base_url=f"http://{host}:{port}", timeout=None)
+    # without a session id the agent uses its default session
+    params = {"session_id": session_id} if session_id is not None else {}
 
-    async with websockets.connect(f"ws://{host}:{port}/ws/steps") as websocket:
+    url = str(httpx.URL(f"ws://{host}:{port}/ws/steps", params=params))
+    async with websockets.connect(url) as websocket:
         if message is not None:
-            coro = client.post("/chat", params={"message": message})
+            coro = client.post("/chat", params={"message": message, **params})
             task = asyncio.create_task(coro)
 
         try:
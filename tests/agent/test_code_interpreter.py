@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.code_interpreter import CodeInterpreter, Constant
+
+
+def test_interpreters_capture_their_own_output_concurrently():
+    interpreters = {
+        name: CodeInterpreter(constants=[Constant.from_defaults(name="NAME", value=name)])
+        for name in "AB"
+    }
+    code = "import time\nfor i in range(5):\n    print(NAME, i)\n    time.sleep(0.01)"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        outputs = dict(
+            zip(
+                interpreters,
+                executor.map(lambda i: i.run_cell(code), interpreters.values()),
+                strict=True,
+            )
+        )
+
+    for name, output in outputs.items():
+        assert output == "".join(f"{name} {i}\n" for i in range(5))
+
+
+def test_reset_restores_namespace():
+    interpreter = CodeInterpreter(constants=[Constant.from_defaults(name="X", value=1)])
+    interpreter.run_cell("X = 2\ny = 3")
+    interpreter.reset()
+
+    assert interpreter.run_cell("print(X, 'y' in dir())") == "1 False\n"
@@ -0,0 +1,28 @@
+import math
+
+import pytest
+
+from agent.code_interpreter import Constant, Function
+from agent.kernel import Kernel, KernelError, KernelPool
+
+
+def test_kernels_use_the_shell_config():
+    kernel = Kernel(functions=[Function.from_defaults(math.sqrt)], constants=[])
+    try:
+        kernel.wait_ready(timeout=30)
+        output = kernel.run_cell("print(get_ipython().history_manager.enabled, sqrt(4))")
+    finally:
+        kernel.close()
+
+    assert output == "False 2.0\n"
+
+
+def test_pool_rejects_actions_kernels_cannot_import():
+    def action() -> None: ...
+
+    action.__module__ = "__main__"
+
+    with pytest.raises(KernelError, match="'action' cannot be sent to a kernel"):
+        KernelPool(functions=[Function.from_defaults(action)], constants=[])
+    with pytest.raises(KernelError, match="'offset' cannot be sent to a kernel"):
+        KernelPool(functions=[], constants=[Constant.from_defaults(lambda: 1, name="offset")])
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from agent.session import Session, SessionManager
+
+
+class FakeAgent:
+    def reset(self) -> None: ...
+
+
+class FakeInterpreter:
+    def __init__(self, memory: int = 0) -> None:
+        self.memory = memory
+        self.closed = False
+
+    def reset(self) -> None: ...
+
+    def close(self) -> None:
+        self.closed = True
+
+    def memory_usage(self) -> int:
+        return self.memory
+
+
+def create_manager(memory: int = 0, **kwargs) -> SessionManager:
+    def create(session_id: str) -> Session:
+        return Session(id=session_id, agent=FakeAgent(), interpreter=FakeInterpreter(memory))
+
+    return SessionManager(create, **kwargs)
+
+
+def test_sessions_are_reused():
+    async def run() -> None:
+        manager = create_manager()
+        assert await manager.get("a") is await manager.get("a")
+        assert await manager.get("a") is not await manager.get("b")
+
+    asyncio.run(run())
+
+
+def test_least_recently_used_session_is_evicted():
+    async def run() -> None:
+        manager = create_manager(max_sessions=2)
+        a = await manager.get("a")
+        await manager.get("b")
+        await manager.get("a")
+        await manager.get("c")
+
+        assert list(manager.sessions) == ["a", "c"]
+        assert not a.interpreter.closed
+
+    asyncio.run(run())
+
+
+def test_idle_sessions_are_evicted():
+    async def run() -> None:
+        manager = create_manager(idle_timeout=10)
+        a = await manager.get("a")
+        await manager.get("b")
+        a.last_used -= 20
+
+        assert manager.evict() == ["a"]
+        assert a.interpreter.closed
+        assert list(manager.sessions) == ["b"]
+
+    asyncio.run(run())
+
+
+def test_busy_sessions_are_not_evicted():
+    async def run() -> None:
+        manager = create_manager(max_sessions=1, idle_timeout=10)
+        a = await manager.get("a")
+        a.last_used -= 20
+        async with a.lock:
+            assert manager.evict() == []
+            await manager.get("b")
+            assert list(manager.sessions) == ["a", "b"]
+        assert manager.evict() == ["a"]
+
+    asyncio.run(run())
+
+
+def test_sessions_are_evicted_above_memory_limit():
+    async def run() -> None:
+        closed = []
+        manager = create_manager(memory=100, memory_limit=250)
+        manager.on_close.append(lambda session: closed.append(session.id))
+        for session_id in "abc":
+            await manager.get(session_id)
+
+        assert manager.evict() == ["a"]
+        assert closed == ["a"]
+        assert manager.memory_usage() == 200
+
+    asyncio.run(run())
+
+
+def test_sessions_are_created_once_off_the_event_loop():
+    async def run() -> None:
+        created = []
+
+        def create(session_id: str) -> Session:
+            # e.g. waiting for a kernel to start, must not block the event loop
+            time.sleep(0.2)
+            created.append(session_id)
+            return Session(id=session_id, agent=FakeAgent(), interpreter=FakeInterpreter())
+
+        manager = SessionManager(create)
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while len(created) == 0:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        a, b, _ = await asyncio.gather(manager.get("a"), manager.get("a"), tick())
+        assert a is b
+        assert created == ["a"]
+        assert ticks > 5
+
+    asyncio.run(run())
@@ -0,0 +1,83 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from environment.dto import ActionArgs
+from environment.remote import RemoteEnv
+from environment.trace import TraceRecorder, read_trace, trace_path
+
+
+def test_trace_is_readable_after_close(tmp_path):
+    file_path = str(tmp_path / "trace.jsonl.gz")
+    env = RemoteEnv(description="test")
+    env.register_const("SIZE", 3, "A size.")
+
+    @env.register_action
+    def add(a: int, b: int) -> int:
+        """Adds two numbers."""
+        return a + b
+
+    recorder = TraceRecorder(file_path)
+    recorder.header(env.description, env.get_consts(), list(env._registered_action_infos.values()))
+    info = env._registered_action_infos[env.get_action_ids()[0]]
+    for i in range(100):
+        recorder.call(info, ActionArgs(args=[i, 1], kwargs={}), lambda i=i: add(i, 1))
+    recorder.close()
+    # closing twice does nothing
+    recorder.close()
+
+    header, calls = read_trace(file_path)
+    assert header["description"] == "test"
+    assert [c["name"] for c in header["consts"]] == ["SIZE"]
+    assert [call["result"] for call in calls] == [i + 1 for i in range(100)]
+
+
+def test_trace_is_closed_on_shutdown(tmp_path):
+    file_path = str(tmp_path / "trace.jsonl.gz")
+    env = RemoteEnv()
+
+    @env.register_action
+    def echo(value: str) -> str:
+        """Returns the value."""
+        return value
+
+    env.record(file_path)
+    app = FastAPI()
+    app.include_router(env)
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/action/take",
+            params={"action_id": env.get_action_ids()[0]},
+            json={"args": ["hello"], "kwargs": {}},
+        )
+        assert response.json()["result"] == "hello"
+
+    _, calls = read_trace(file_path)
+    assert [call["result"] for call in calls] == ["hello"]
+
+
+def test_trace_paths_of_environments_differ():
+    assert trace_path("traces/trace.jsonl.gz", "robot") == "traces/trace.robot.jsonl.gz"
+    assert trace_path("trace", "std") == "trace.std"
+
+
+def test_streams_closed_early_are_recorded(tmp_path):
+    file_path = str(tmp_path / "trace.jsonl")
+    env = RemoteEnv()
+
+    @env.register_action
+    def count() -> int:
+        """Counts up."""
+        return 0
+
+    recorder = TraceRecorder(file_path)
+    recorder.header(env.description, [], list(env._registered_action_infos.values()))
+    info = env._registered_action_infos[env.get_action_ids()[0]]
+    stream = recorder.stream(info, ActionArgs(), iter(range(10)))
+    assert [next(stream), next(stream)] == [0, 1]
+    stream.close()
+    recorder.close()
+
+    _, calls = read_trace(file_path)
+    assert [entry["item"] for entry in calls[0]["result"]] == [0, 1]
+    assert calls[0]["error"] is None
@@ -0,0 +1,48 @@
+import json
+from types import SimpleNamespace
+
+from PIL import Image
+
+from environment.std_actions.cache import ResponseCache
+from environment.std_actions.vlm import VisionLanguageModelAction
+
+
+def test_packed_fallback_counts_each_cache_miss_once(tmp_path, monkeypatch):
+    async def acomplete(self, prompt, image_documents, **kwargs):
+        if len(image_documents) > 1:
+            raise RuntimeError("packed request failed")
+        return SimpleNamespace(text="answer")
+
+    monkeypatch.setattr(VisionLanguageModelAction, "acomplete", acomplete)
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    vlm = VisionLanguageModelAction(cache=cache, model="gpt-4o", api_key="test")
+    images = [Image.new("RGB", (32, 32), color) for color in ["red", "green", "blue"]]
+
+    assert vlm.prompt_vision_model_batch("What?", images, mode="packed") == ["answer"] * 3
+    assert cache.stats.misses == 3
+
+    # the answers of the single requests are cached
+    assert vlm.prompt_vision_model_batch("What?", images, mode="concurrent") == ["answer"] * 3
+    assert cache.stats.hits == 3
+
+
+def test_packed_answers_are_cached_apart_from_single_answers(tmp_path, monkeypatch):
+    async def acomplete(self, prompt, image_documents, **kwargs):
+        return SimpleNamespace(text=json.dumps(["packed"] * len(image_documents)))
+
+    def complete(self, prompt, image_documents, **kwargs):
+        return SimpleNamespace(text="single")
+
+    monkeypatch.setattr(VisionLanguageModelAction, "acomplete", acomplete)
+    monkeypatch.setattr(VisionLanguageModelAction, "complete", complete)
+    vlm = VisionLanguageModelAction(
+        cache=ResponseCache(str(tmp_path / "cache.sqlite")), model="gpt-4o", api_key="test"
+    )
+    images = [Image.new("RGB", (32, 32), color) for color in ["red", "green"]]
+
+    assert vlm.prompt_vision_model_batch("What?", images, mode="packed") == ["packed"] * 2
+    assert vlm.prompt_vision_model("What?", images[0]) == "single"
+
+    # packed cache hits are recorded like the ones of single requests
+    assert vlm.prompt_vision_model_batch("What?", images, mode="packed") == ["packed"] * 2
+    assert [stats["cached"] for stats in vlm.get_request_stats()[-2:]] == [True, True]
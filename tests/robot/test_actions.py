@@ -0,0 +1,107 @@
+import pytest
+
+from robot.actions import RobotActions
+from robot.camera import FakeCamera
+from robot.sim import SimObject, SimulatedCRIController
+
+
+class RecordingController(SimulatedCRIController):
+    """Simulation that records the moves it is sent."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(acceleration=1e6, command_latency=0.0, enable_time=0.0, **kwargs)
+        self.moves: list[tuple[tuple[float, float, float], bool]] = []
+
+    def move_cartesian(self, *pose: float, wait_move_finished: bool = False, **kwargs) -> bool:
+        self.moves.append((pose[:3], wait_move_finished))
+        return super().move_cartesian(*pose, wait_move_finished=wait_move_finished, **kwargs)
+
+
+@pytest.fixture
+def robot():
+    controller = RecordingController(objects=[SimObject(250, 50)], gripper_time=0.0)
+    robot = RobotActions(
+        camera=FakeCamera(resolution=(64, 48)),
+        controller=controller,
+        gripper_feedback=controller.gripper_feedback,
+    )
+    robot.velocity = 10000
+    robot.grab_time = robot.release_time = 0.0
+    robot.gripper_timeout = 0.1
+    controller.moves.clear()
+    yield robot
+    robot.shutdown()
+
+
+def test_pick_and_place_descends_vertically(robot):
+    report = robot.pick_and_place((250, 50), (300, -50))
+    assert report["success"]
+
+    moves = robot.controller.moves
+    for x, y, height in [(250, 50, robot.grab_height), (300, -50, robot.release_height)]:
+        i = moves.index(((x, y, height), True))
+        # the arm stops right above the object before descending
+        assert moves[i - 1] == ((x, y, robot.move_height), True)
+
+
+def test_move_path_rejects_waypoints_outside_the_workspaces(robot):
+    assert not robot.move_path([(250, 0, robot.move_height), (0, 0, robot.move_height)])
+    assert robot.controller.moves == []
+
+
+def test_moves_are_not_blended_by_default(robot):
+    assert robot.move_to(0, 300)
+    assert all(wait for _, wait in robot.controller.moves)
+
+
+def test_missed_grab_lifts_and_opens_the_gripper(robot):
+    assert robot.move_to(300, 0)
+    assert not robot.grab_object()
+
+    assert robot.get_position()[2] == pytest.approx(robot.move_height)
+    assert robot.state.gripper_closed is False
+
+
+def test_failed_pick_and_place_lifts_and_opens_the_gripper(robot):
+    report = robot.pick_and_place((300, 0), (250, -50))
+
+    assert not report["success"]
+    assert [step["step"] for step in report["steps"][-2:]] == ["grab", "recover"]
+    assert report["steps"][-1]["success"]
+    assert robot.get_position()[2] == pytest.approx(robot.move_height)
+    assert robot.state.gripper_closed is False
+
+
+def test_failing_moves_do_not_keep_the_arm_moving(robot, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ConnectionError("controller disconnected")
+
+    monkeypatch.setattr(robot.controller, "move_cartesian", fail)
+    with pytest.raises(ConnectionError):
+        robot.move_to(300, 0)
+    assert not robot.state.moving
+
+    robot.motions.shutdown()
+    with pytest.raises(RuntimeError):
+        robot.move_to_async(300, 0)
+    assert not robot.state.moving
+
+
+def test_pick_and_place_fails_before_moving_if_the_camera_pose_is_unreachable(robot):
+    robot.camera_pose = (0, 0, 350)
+
+    report = robot.pick_and_place((250, 50), (300, -50), return_to_camera=True)
+    assert report["error"] == "unreachable"
+    assert robot.controller.moves == []
+
+
+def test_enabling_is_waited_for_once(monkeypatch):
+    controller = RecordingController()
+    monkeypatch.setattr(
+        controller, "wait_for_kinematics_ready", lambda *args, **kwargs: pytest.fail("waited twice")
+    )
+    robot = RobotActions(camera=FakeCamera(resolution=(64, 48)), controller=controller)
+    try:
+        assert robot.waits.get_stats()["enable"]["count"] == 1
+    finally:
+        robot.shutdown()
@@ -0,0 +1,26 @@
+import numpy as np
+
+from robot.camera import FakeCamera, FrameGrabber
+
+
+class FailingCamera(FakeCamera):
+    """Camera whose first reads raise, like a driver that lost the device."""
+
+    def __init__(self, failures: int) -> None:
+        super().__init__(resolution=(8, 8), fps=1000.0)
+        self.failures = failures
+
+    def read(self) -> tuple[bool, np.ndarray]:
+        if self.failures > 0:
+            self.failures -= 1
+            raise OSError("camera disconnected")
+        return super().read()
+
+
+def test_grabber_keeps_running_after_read_errors():
+    grabber = FrameGrabber(FailingCamera(failures=3), exposure_time=0.001)
+    grabber.start()
+    try:
+        assert grabber.wait_for_frame(timeout=1.0) is not None
+    finally:
+        grabber.stop()